@@ -1,6 +1,6 @@
 import json
 
-from littlepaimon_utils import aiorequests
+from ..utils import http_util
 
 host = 'https://api-cloudgame.mihoyo.com/'
 
@@ -27,7 +27,7 @@ def get_header(uuid: str, token: str):
 
 async def check_token(uuid: str, cookie: str):
     headers = get_header(uuid, cookie)
-    req = await aiorequests.post(host + 'hk4e_cg_cn/gamer/api/login', headers=headers)
+    req = await http_util.post(host + 'hk4e_cg_cn/gamer/api/login', headers=headers)
     data = json.loads(req.text)
     if data['retcode'] == 0 and data['message'] == 'OK':
         return True
@@ -36,19 +36,19 @@ async def check_token(uuid: str, cookie: str):
 
 async def get_Info(uuid: str, cookie: str):
     headers = get_header(uuid, cookie)
-    req = await aiorequests.get(host + 'hk4e_cg_cn/wallet/wallet/get', headers=headers)
+    req = await http_util.get(host + 'hk4e_cg_cn/wallet/wallet/get', headers=headers)
     return json.loads(req.text)
 
 
 async def get_Announcement(uuid: str, cookie: str):
     headers = get_header(uuid, cookie)
-    req = await aiorequests.get(host + 'hk4e_cg_cn/gamer/api/getAnnouncementInfo', headers=headers)
+    req = await http_util.get(host + 'hk4e_cg_cn/gamer/api/getAnnouncementInfo', headers=headers)
     return json.loads(req.text)
 
 
 async def get_Notification(uuid: str, cookie: str):
     headers = get_header(uuid, cookie)
-    req = await aiorequests.get(
+    req = await http_util.get(
         host + 'hk4e_cg_cn/gamer/api/listNotifications?status=NotificationStatusUnread&type=NotificationTypePopup'
                '&is_sort=true',
         headers=headers)
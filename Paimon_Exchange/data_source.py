@@ -6,13 +6,14 @@ import time
 from asyncio import sleep
 from pathlib import Path
 
-from littlepaimon_utils import aiorequests
 from littlepaimon_utils.files import save_json, load_json
 from nonebot import require, get_bot, get_driver
 
 require('nonebot_plugin_apscheduler')
 from nonebot_plugin_apscheduler import scheduler
 
+from ..utils import http_util
+
 driver = get_driver()
 
 
@@ -29,7 +30,7 @@ async def get_address(cookie):
         'Referer':         'https://user.mihoyo.com/',
         'User-Agent':      'Mozilla/5.0 (iPhone; CPU iPhone OS 15_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) miHoYoBBS/2.25.1'
     }
-    res = await aiorequests.get(url=address_url, headers=header)
+    res = await http_util.get(url=address_url, headers=header)
     res = res.json()
     if res['message'] == 'OK':
         address = res['data']['list']
@@ -50,7 +51,7 @@ async def get_goods(game):
     goods_list_new = []
     page = 1
     while True:
-        res = await aiorequests.get(url=url.format(page=page))
+        res = await http_util.get(url=url.format(page=page))
         res = res.json()
         if not res['data']['list']:
             break
@@ -101,7 +102,7 @@ def save_exchange_info(user_id, state):
 
 async def get_bbs_info(info, headers):
     url = 'https://api-takumi.mihoyo.com/binding/api/getUserGameRolesByCookie'
-    res = (await aiorequests.get(url=url, headers=headers)).json()
+    res = (await http_util.get(url=url, headers=headers)).json()
     if res['retcode'] == 0:
         data = res['data']['list']
         for d in data:
@@ -115,10 +116,10 @@ async def get_stoken(cookie):
     bbs_cookie_url2 = 'https://api-takumi.mihoyo.com/auth/api/getMultiTokenByLoginTicket?login_ticket={}&token_types=3&uid={}'
 
     login_ticket = re.search('login_ticket=[a-zA-Z0-9]{0,100}', cookie)
-    data = (await aiorequests.get(url=bbs_cookie_url.format(login_ticket.group().split('=')[1]))).json()
+    data = (await http_util.get(url=bbs_cookie_url.format(login_ticket.group().split('=')[1]))).json()
     if '成功' in data['data']['msg']:
         stuid = data['data']['cookie_info']['account_id']
-        data2 = (await aiorequests.get(url=bbs_cookie_url2.format(login_ticket.group().split('=')[1], stuid))).json()
+        data2 = (await http_util.get(url=bbs_cookie_url2.format(login_ticket.group().split('=')[1], stuid))).json()
         return data2['data']['list'][0]['token']
     else:
         return None
@@ -165,7 +166,7 @@ async def exchange_action(info):
     exchange_url = 'https://api-takumi.mihoyo.com/mall/v1/web/goods/exchange'
     flag = False
     for _ in range(3):
-        exchange_res = (await aiorequests.post(url=exchange_url, headers=headers, json=data)).json()
+        exchange_res = (await http_util.post(url=exchange_url, headers=headers, json=data)).json()
         if exchange_res['retcode'] == 0:
             await get_bot().send_private_msg(user_id=info['user_id'],
                                              message=f'你的米游币商品{info["商品"]["name"]}的兑换成功，结果为:\n{exchange_res["message"]}')
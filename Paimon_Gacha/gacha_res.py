@@ -3,14 +3,14 @@ import random
 from pathlib import Path
 
 import numpy
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from littlepaimon_utils.files import load_json
 
 from .gacha_info import init_user_info, user_info, save_user_info
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import load_asset, load_font
+from ..utils.render_util import render_pool
 
 RES_PATH = Path() / 'resources' / 'LittlePaimon' / 'gacha_res'
-font_path = Path() / 'resources' / 'LittlePaimon' / 'hywh.ttf'
 
 
 def random_int():
@@ -156,18 +156,18 @@ def once(uid, gacha_data):
     return role
 
 
-async def create_item(rank, item_type, name, element, count, dg_time):
+def create_item(rank, item_type, name, element, count, dg_time):
     type_json = load_json(RES_PATH / 'type.json', encoding="utf-8")
-    count_font = ImageFont.truetype(str(font_path), 35)
-    bg = Image.open(RES_PATH / f'{rank}_background.png').resize((143, 845))
-    item_img = Image.open(RES_PATH / item_type / f'{name}.png')
-    rank_img = Image.open(RES_PATH / f'{rank}_star.png').resize((119, 30))
+    count_font = load_font('hywh.ttf', 35)
+    bg = load_asset(RES_PATH / f'{rank}_background.png', size=(143, 845))
+    item_img = load_asset(RES_PATH / item_type / f'{name}.png')
+    rank_img = load_asset(RES_PATH / f'{rank}_star.png', size=(119, 30))
 
     if item_type == '角色':
         item_img = item_img.resize((item_img.size[0] + 12, item_img.size[1] + 45))
         item_img.alpha_composite(rank_img, (4, 510))
 
-        item_type_icon = Image.open(RES_PATH / '元素' / f'{element}.png').resize((80, 80))
+        item_type_icon = load_asset(RES_PATH / '元素' / f'{element}.png', size=(80, 80))
         item_img.alpha_composite(item_type_icon, (25, 420))
         bg.alpha_composite(item_img, (3, 125))
 
@@ -177,7 +177,7 @@ async def create_item(rank, item_type, name, element, count, dg_time):
 
         item_type_icon = type_json.get(name)
         if item_type_icon:
-            item_type_icon = Image.open(RES_PATH / '类型' / f'{item_type_icon}.png').resize((100, 100))
+            item_type_icon = load_asset(RES_PATH / '类型' / f'{item_type_icon}.png', size=(100, 100))
 
             bg.alpha_composite(item_type_icon, (18, 530))
     if rank == 5 and count != -1:
@@ -194,8 +194,8 @@ async def create_item(rank, item_type, name, element, count, dg_time):
     return bg
 
 
-async def ten(uid, gacha_data):
-    type_json = load_json(RES_PATH / 'type.json', encoding="utf-8")
+def ten(uid, gacha_data):
+    # 抽卡结果会修改用户的保底记录，在事件循环中进行，只把绘图交给绘图执行器
     gacha_list = []
     for i in range(0, 10):
         if gacha_data['gacha_type'] == 'all_star':
@@ -206,7 +206,12 @@ async def ten(uid, gacha_data):
             role = once(uid, gacha_data).copy()
         gacha_list.append(role)
     gacha_list.sort(key=lambda x: x["rank"], reverse=True)
-    img = Image.open(RES_PATH / 'background.png')
+    return gacha_list
+
+
+def draw_ten(gacha_list):
+    type_json = load_json(RES_PATH / 'type.json', encoding="utf-8")
+    img = load_asset(RES_PATH / 'background.png')
     i = 0
     for wish in gacha_list:
         i += 1
@@ -219,7 +224,7 @@ async def ten(uid, gacha_data):
             dg_time = wish['dg_time']
         except:
             dg_time = -1
-        i_img = await create_item(rank, item_type, name, element, count, dg_time)
+        i_img = create_item(rank, item_type, name, element, count, dg_time)
         img.alpha_composite(i_img, (105 + (i_img.size[0] * i), 123))
 
     img.thumbnail((1024, 768))
@@ -229,16 +234,22 @@ async def ten(uid, gacha_data):
 
 
 async def more_ten(uid, gacha_data, num, sd):
+    gacha_lists = [ten(uid, gacha_data) for _ in range(num)]
+    return await render_pool.render(draw_more_ten, gacha_lists, str(sd.nickname), quality=75, mode='RGB')
+
+
+def draw_more_ten(gacha_lists, nickname):
+    num = len(gacha_lists)
     time_str = datetime.datetime.strftime(datetime.datetime.now(), '%m-%d %H:%M')
-    time_font = ImageFont.truetype(str(font_path), 20)
+    time_font = load_font('hywh.ttf', 20)
     if num == 1:
-        img = await ten(uid, gacha_data)
+        img = draw_ten(gacha_lists[0])
     else:
         img = Image.new("RGB", (1024, 575 * num), (255, 255, 255))
         for i in range(0, num):
-            item_img = await ten(uid, gacha_data)
+            item_img = draw_ten(gacha_lists[i])
             img.paste(item_img, (0, 575 * i))
     draw = ImageDraw.Draw(img)
-    draw.text((27, 575 * num - 30), ('@%s %s  Created By LittlePaimon' % (str(sd.nickname), time_str)), font=time_font,
+    draw.text((27, 575 * num - 30), ('@%s %s  Created By LittlePaimon' % (nickname, time_str)), font=time_font,
               fill="#8E8E8E")
-    return MessageBuild.Image(img, quality=75, mode='RGB')
+    return img
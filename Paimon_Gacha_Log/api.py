@@ -1,6 +1,6 @@
 from urllib import parse
 
-from littlepaimon_utils import aiorequests
+from ..utils import http_util
 
 
 def toApi(url):
@@ -30,7 +30,7 @@ def getApi(url, gachaType, size, page, end_id=""):
 
 async def checkApi(url):
     try:
-        j = await aiorequests.get(url=url)
+        j = await http_util.get(url=url)
         j = j.json()
     except Exception as e:
         return f'API请求解析出错：{e}'
@@ -58,6 +58,6 @@ async def getGachaInfo(url):
     region = getQueryVariable(url, "region")
     lang = getQueryVariable(url, "lang")
     gachaInfoUrl = "https://webstatic.mihoyo.com/hk4e/gacha_info/{}/items/{}.json".format(region, lang)
-    resp = await aiorequests.get(url=gachaInfoUrl)
+    resp = await http_util.get(url=gachaInfoUrl)
     gachaInfo = resp.json()
     return gachaInfo
@@ -1,9 +1,9 @@
 from pathlib import Path
-from asyncio import sleep
 
-from littlepaimon_utils import aiorequests
 from littlepaimon_utils.files import load_json, save_json
 
+from ..utils import http_util
+from ..utils.rate_limit import rate_limiter
 from .UIGF_and_XLSX import convertUIGF, writeXLSX
 from .api import getApi
 from .meta_data import gachaQueryTypeIds, gachaQueryTypeDict
@@ -18,7 +18,8 @@ async def getGachaLogs(url, gachaTypeId):
     end_id = "0"
     for page in range(1, 9999):
         api = getApi(url, gachaTypeId, size, page, end_id)
-        resp = await aiorequests.get(url=api)
+        await rate_limiter.acquire('gacha_log')
+        resp = await http_util.get(url=api)
         j = resp.json()
         gacha = j["data"]["list"]
         if not len(gacha):
@@ -26,7 +27,6 @@ async def getGachaLogs(url, gachaTypeId):
         for i in gacha:
             gachaList.append(i)
         end_id = j["data"]["list"][-1]["id"]
-        await sleep(0.5)
 
     return gachaList
 
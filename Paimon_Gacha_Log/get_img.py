@@ -1,18 +1,23 @@
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
 from ..utils.alias_handler import get_short_name
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import image_cache, load_asset, load_font
+from ..utils.render_util import render_pool
 
 res_path = Path() / 'resources' / 'LittlePaimon'
 
 
 def get_font(size):
-    return ImageFont.truetype(str(res_path / 'msyh.ttc'), size)
+    return load_font('msyh.ttc', size)
 
 
-async def get_circle_avatar(avatar, size):
+def get_circle_avatar(avatar, size):
+    key = ('circle_avatar', avatar, size)
+    ret_img = image_cache.get(key)
+    if ret_img is not None:
+        return ret_img
     avatar = Image.open(res_path / 'thumb' / f'{avatar}.png')
     w, h = avatar.size
     bg = Image.new('RGBA', (w, h), (213, 153, 77, 255))
@@ -25,10 +30,11 @@ async def get_circle_avatar(avatar, size):
     mask = mask.resize((size, size), Image.ANTIALIAS)
     ret_img = bg.copy()
     ret_img.putalpha(mask)
+    image_cache.set(key, ret_img)
     return ret_img
 
 
-async def sort_data(gacha_data):
+def sort_data(gacha_data):
     sprog_data = {'type': '新手', 'total_num': 0, '5_star': [], '4_star': [], '5_gacha': 0, '4_gacha': 0}
     permanent_data = {'type': '常驻', 'total_num': 0, '5_star': [], '4_star': [], '5_gacha': 0, '4_gacha': 0}
     role_data = {'type': '角色', 'total_num': 0, '5_star': [], '4_star': [], '5_gacha': 0, '4_gacha': 0}
@@ -54,12 +60,12 @@ async def sort_data(gacha_data):
     return new_gacha_data
 
 
-async def draw_gacha_log(data):
+def draw_gacha_log(data):
     if data['total_num'] == 0:
         return None
-    top = Image.open(res_path / 'player_card' / 'gacha_log_top.png')
-    mid = Image.open(res_path / 'player_card' / '卡片身体.png').resize((768, 80))
-    bottom = Image.open(res_path / 'player_card' / '卡片底部.png').resize((768, 51))
+    top = load_asset(res_path / 'player_card' / 'gacha_log_top.png')
+    mid = load_asset(res_path / 'player_card' / '卡片身体.png', size=(768, 80))
+    bottom = load_asset(res_path / 'player_card' / '卡片底部.png', size=(768, 51))
     five_star = data['5_star']
     col = int(len(five_star) / 6)
     if not len(five_star) % 6 == 0:
@@ -93,7 +99,7 @@ async def draw_gacha_log(data):
     bg_draw = ImageDraw.Draw(bg_img)
     n = 0
     for c in five_star:
-        avatar = await get_circle_avatar(c[0], 45)
+        avatar = get_circle_avatar(c[0], 45)
         f = 10 if data['type'] == '武器' else 0
         if c[1] <= 20:
             color = 'red'
@@ -113,12 +119,16 @@ async def draw_gacha_log(data):
 
 
 async def get_gacha_log_img(gacha_data, pool):
-    all_gacha_data = await sort_data(gacha_data)
+    return await render_pool.render(draw_gacha_log_img, gacha_data, pool, mode='RGB')
+
+
+def draw_gacha_log_img(gacha_data, pool):
+    all_gacha_data = sort_data(gacha_data)
     if pool != 'all':
         img = None
         for pd in all_gacha_data:
             if pd['type'] == pool:
-                img = await draw_gacha_log(pd)
+                img = draw_gacha_log(pd)
                 break
         if not img:
             return '这个池子没有抽卡记录哦'
@@ -128,7 +138,7 @@ async def get_gacha_log_img(gacha_data, pool):
         total_height = 0
         now_height = 0
         for pd in all_gacha_data:
-            p_img = await draw_gacha_log(pd)
+            p_img = draw_gacha_log(pd)
             if p_img:
                 img_list.append(p_img)
                 total_height += p_img.size[1]
@@ -142,4 +152,4 @@ async def get_gacha_log_img(gacha_data, pool):
     img_draw.text((595, 44), f'UID:{gacha_data["uid"]}', font=get_font(16), fill='black')
     img_draw.text((530, total_height - 45), 'Created by LittlePaimon', font=get_font(16), fill='black')
 
-    return MessageBuild.Image(img, mode='RGB')
+    return img
@@ -2,12 +2,14 @@ import contextlib
 import datetime
 import random
 import re
-from asyncio import sleep
+from asyncio import sleep, Semaphore, as_completed
 from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Type, Union
 
 from littlepaimon_utils.tools import FreqLimiter
 from nonebot import on_command, require, logger, get_bot
-from nonebot.adapters.onebot.v11 import MessageEvent, Message, Bot, MessageSegment
+from nonebot.adapters.onebot.v11 import MessageEvent, Message, Bot, MessageSegment, ActionFailed
+from nonebot.matcher import Matcher
 from nonebot.params import CommandArg, Arg
 from nonebot.permission import SUPERUSER
 from nonebot.plugin import PluginMetadata
@@ -24,17 +26,19 @@ from .get_data import addStoken, get_bind_game, get_sign_info, sign, get_sign_li
 from .get_data import get_monthinfo_data, get_player_card_data, get_chara_detail_data, get_chara_skill_data
 from ..utils.alias_handler import get_match_alias
 from ..utils.auth_util import check_cookie
+from ..utils.circuit_breaker import CircuitOpenError
 from ..utils.config import config
 from ..utils.db_util import get_auto_sign, delete_auto_sign, get_last_query, get_private_stoken, update_private_stoken, \
     get_coin_auto_sign
 from ..utils.db_util import insert_public_cookie, update_private_cookie, delete_cookie_cache, delete_private_cookie, \
     update_last_query, reset_public_cookie
-from ..utils.db_util import update_note_remind2, update_note_remind, get_note_remind, delete_note_remind, \
+from ..utils.db_util import update_note_remind2, update_note_remind, get_due_note_remind, delete_note_remind, \
     update_day_remind_count, get_private_cookie, add_auto_sign, get_all_query, add_coin_auto_sign, delete_coin_auto_sign
 from ..utils.decorator import exception_handler
 from ..utils.enka_util import PlayerInfo
 from ..utils.message_util import MessageBuild as MsgBd
 from ..utils.message_util import get_uid_in_msg, uid_userId_to_dict, replace_all, transform_uid, get_message_id
+from ..utils.rate_limit import rate_limiter
 
 require('nonebot_plugin_apscheduler')
 from nonebot_plugin_apscheduler import scheduler
@@ -213,6 +217,48 @@ async def _(event: MessageEvent, state: T_State, msg: Message = CommandArg()):
         state['msg'] = msg_text.strip()
 
 
+async def query_each(matcher: Type[Matcher], query_dict: Dict[str, str], total_result: Message,
+                     pipeline: Callable[[str, str], Awaitable[Union[str, Message, MessageSegment]]]):
+    """
+    对每个uid执行查询和绘图，多个uid时并发执行，同时进行的不超过paimon_query_concurrency个，
+    每个uid的图片绘制好就先发送，查询失败的提示最后一起发送
+    :param matcher: 响应器
+    :param query_dict: uid -> user_id
+    :param total_result: 已有的提示信息
+    :param pipeline: 查询并绘制单个uid的协程函数，参数为uid和user_id，返回图片或失败的提示
+    """
+    if len(query_dict) <= 1:
+        for uid, user_id in query_dict.items():
+            await update_last_query(user_id, uid)
+            result = await pipeline(uid, user_id)
+            total_result += MessageSegment.text(result + '\n') if isinstance(result, str) else result
+        await matcher.finish(total_result)
+    semaphore = Semaphore(max(1, config.paimon_query_concurrency))
+
+    async def run(uid: str, user_id: str):
+        async with semaphore:
+            try:
+                await update_last_query(user_id, uid)
+                return uid, await pipeline(uid, user_id)
+            except CircuitOpenError as e:
+                return uid, str(e)
+            except Exception as e:
+                logger.exception(f'派蒙查询{uid}时出错')
+                return uid, f'派蒙好像出了点问题，{e}'
+
+    for future in as_completed([run(uid, user_id) for uid, user_id in query_dict.items()]):
+        uid, result = await future
+        if isinstance(result, str):
+            total_result += MessageSegment.text(f'{uid}：{result}\n')
+            continue
+        try:
+            await matcher.send(result)
+        except ActionFailed:
+            logger.exception('账号可能被风控，消息发送失败')
+            total_result += MessageSegment.text(f'{uid}：派蒙可能被风控，消息发送失败\n')
+    await matcher.finish(total_result or None)
+
+
 @sy.got('uid', prompt='请把要查询的uid给派蒙哦~')
 @exception_handler()
 async def _(event: MessageEvent, state: T_State):
@@ -228,15 +274,14 @@ async def _(event: MessageEvent, state: T_State):
     true_floor = [int(f) for f in floor if f.isdigit() and (9 <= int(f) <= 12)]
     true_floor.sort()
     query_dict, total_result = uid_userId_to_dict(state['uid'], state['user_id'])
-    for uid, user_id in query_dict.items():
-        await update_last_query(user_id, uid)
+
+    async def pipeline(uid: str, user_id: str):
         data = await get_abyss_data(user_id, uid, use_cache=state['use_cache'])
         if isinstance(data, str):
-            total_result += MessageSegment.text(data + '\n')
-        else:
-            abyss_card = await draw_abyss_card(data, uid, true_floor)
-            total_result += abyss_card
-    await sy.finish(total_result)
+            return data
+        return await draw_abyss_card(data, uid, true_floor)
+
+    await query_each(sy, query_dict, total_result, pipeline)
 
 
 @ssbq.handle()
@@ -307,22 +352,21 @@ async def ys_handler(bot: Bot, event: MessageEvent, state: T_State):
     else:
         await ysa.finish('这个uid不正确哦~，请检查一下', at_sender=True)
     query_dict, total_result = uid_userId_to_dict(state['uid'], state['user_id'])
-    for uid, user_id in query_dict.items():
-        await update_last_query(user_id, uid)
+
+    async def pipeline(uid: str, user_id: str):
         data = await get_player_card_data(user_id, uid, use_cache=state['use_cache'])
         if isinstance(data, str):
-            total_result += MessageSegment.text(data + '\n')
+            return data
+        if event.message_type == 'group':
+            user_info = await bot.get_group_member_info(group_id=event.group_id, user_id=int(user_id))
+            nickname = user_info['card'] or user_info['nickname']
         else:
-            if event.message_type == 'group':
-                user_info = await bot.get_group_member_info(group_id=event.group_id, user_id=int(user_id))
-                nickname = user_info['card'] or user_info['nickname']
-            else:
-                nickname = event.sender.nickname
-            chara_data = await get_chara_detail_data(user_id, uid, use_cache=state['use_cache'])
-            chara_data = None if isinstance(chara_data, str) else chara_data
-            player_card = await draw_player_card(data, chara_data, uid, nickname)
-            total_result += player_card
-    await ys.finish(total_result)
+            nickname = event.sender.nickname
+        chara_data = await get_chara_detail_data(user_id, uid, use_cache=state['use_cache'])
+        chara_data = None if isinstance(chara_data, str) else chara_data
+        return await draw_player_card(data, chara_data, uid, nickname)
+
+    await query_each(ys, query_dict, total_result, pipeline)
 
 
 @ysa.got('uid', prompt='请把要查询的uid给派蒙哦~')
@@ -334,15 +378,14 @@ async def ysa_handler(event: MessageEvent, state: T_State):
     else:
         await ysa.finish('这个uid不正确哦~，请检查一下', at_sender=True)
     query_dict, total_result = uid_userId_to_dict(state['uid'], state['user_id'])
-    for uid, user_id in query_dict.items():
-        await update_last_query(user_id, uid)
+
+    async def pipeline(uid: str, user_id: str):
         chara_data = await get_chara_detail_data(user_id, uid, use_cache=state['use_cache'])
         if isinstance(chara_data, str):
-            total_result += MessageSegment.text(chara_data + '\n')
-        else:
-            player_card = await draw_all_chara_card(chara_data, uid)
-            total_result += player_card
-    await ysa.finish(total_result)
+            return chara_data
+        return await draw_all_chara_card(chara_data, uid)
+
+    await query_each(ysa, query_dict, total_result, pipeline)
 
 
 @ysc.got('uid', prompt='请把要查询的uid给派蒙哦~')
@@ -400,16 +443,15 @@ async def _(event: MessageEvent, state: T_State):
         else:
             role = [m for m in list(match_alias.items()) if m[0] == choice][0]
     query_dict, total_result = uid_userId_to_dict(state['uid'], state['user_id'])
-    for uid, user_id in query_dict.items():
-        await update_last_query(user_id, uid)
+
+    async def pipeline(uid: str, user_id: str):
         chara_data = await get_chara_detail_data(user_id, uid, use_cache=state['use_cache'])
         if isinstance(chara_data, str):
-            total_result += MessageSegment.text(chara_data + '\n')
-        else:
-            skill_data = await get_chara_skill_data(uid, role[1], use_cache=state['use_cache'])
-            chara_card = await draw_chara_card(chara_data, skill_data, role, uid)
-            total_result += chara_card
-    await ysc.finish(total_result)
+            return chara_data
+        skill_data = await get_chara_skill_data(uid, role[1], use_cache=state['use_cache'])
+        return await draw_chara_card(chara_data, skill_data, role, uid)
+
+    await query_each(ysc, query_dict, total_result, pipeline)
 
 
 cookie_error_msg = '这个cookie无效哦，请旅行者确认是否正确\n获取cookie的教程：\ndocs.qq.com/doc/DQ3JLWk1vQVllZ2Z1\n'
@@ -664,6 +706,7 @@ async def auto_sign():
         logger.info('---派蒙开始执行米游社自动签到---')
         sign_list = await get_sign_list()
         for user_id, uid, remind_id in data:
+            await rate_limiter.acquire('sign')
             sign_info = await get_sign_info(uid)
             if isinstance(sign_info, str):
                 with contextlib.suppress(Exception):
@@ -677,11 +720,12 @@ async def auto_sign():
                 logger.info(f'---qq{user_id}的UID{uid}已经签过，跳过---')
             else:
                 for _ in range(5):
+                    await rate_limiter.acquire('sign')
                     sign_result = await sign(uid)
                     if isinstance(sign_result, dict):
-                        # success为0则说明没有出现验证码，不为0则有验证码，等待5-10秒再重试，重试最多5次
+                        # success为0则说明没有出现验证码，不为0则有验证码，取得令牌后再重试，重试最多5次
                         if sign_result['data']['success'] == 0:
-                            await sleep(1)
+                            await rate_limiter.acquire('sign')
                             sign_info = await get_sign_info(uid)
                             sign_day = sign_info['data']['total_sign_day'] - 1
                             with contextlib.suppress(Exception):
@@ -692,9 +736,6 @@ async def auto_sign():
                                     ann[remind_id]['成功'].append(
                                         f'.UID{uid}-{sign_list["data"]["awards"][sign_day]["name"]}*{sign_list["data"]["awards"][sign_day]["cnt"]}')
                             break
-                        else:
-                            await sleep(random.randint(5, 10))
-            await sleep(random.randint(20, 35))
         for group_id, content in ann.items():
             group_str = '米游社自动签到结果：\n'
             for type, ann_list in content.items():
@@ -716,7 +757,6 @@ async def coin_auto_sign():
     if data:
         logger.info('---派蒙开始执行米游币自动获取---')
         for user_id, uid, remind_id in data:
-            await sleep(random.randint(20, 35))
             sk = await get_private_stoken(uid, key='uid')
             try:
                 stoken = sk[0][4]
@@ -762,54 +802,43 @@ async def check_note():
     end_time = datetime.datetime(now_time.year, now_time.month, now_time.day, config.paimon_remind_end, 0, 0)
     if start_time < now_time < end_time:
         return
-    data = await get_note_remind()
+    data = await get_due_note_remind(cooldown=30 * 60, limit=config.paimon_remind_limit)
     if data:
         logger.info('---派蒙开始检查实时便签树脂提醒---')
         for user_id, uid, count, remind_group, enable, last_remind_time, today_remind_count in data:
-            if last_remind_time:
-                last_remind_time = datetime.datetime.strptime(last_remind_time, '%Y%m%d %H:%M:%S')
-                if now_time - last_remind_time > datetime.timedelta(minutes=30):
-                    time_e = True
-                else:
-                    time_e = False
+            await rate_limiter.acquire('record')
+            now_data = await get_daily_note_data(uid)
+            if isinstance(now_data, str):
+                try:
+                    await delete_note_remind(user_id, uid)
+                    if user_id == remind_group:
+                        await get_bot().send_private_msg(user_id=user_id,
+                                                         message=f'[CQ:at,qq={user_id}]你的cookie失效了哦,派蒙没办法帮你检查树脂,'
+                                                                 f'请重新添加ck后再叫派蒙开启提醒')
+                    else:
+                        await get_bot().send_group_msg(group_id=remind_group,
+                                                       message=f'[CQ:at,qq={user_id}]你的cookie失效了哦,派蒙没办法帮你检查树脂,'
+                                                               f'请重新添加ck后再叫派蒙开启提醒')
+                except Exception as e:
+                    logger.error(f'---派蒙发送树脂提醒失败:{e}---')
             else:
-                time_e = True
-            if enable and ((
-                                   today_remind_count and today_remind_count < config.paimon_remind_limit) or not today_remind_count) and time_e:
-                now_data = await get_daily_note_data(uid)
-                if isinstance(now_data, str):
+                if now_data['data']['current_resin'] >= count:
+                    logger.info(f'---用户{user_id}的uid{uid}的树脂已经达到阈值了,发送提醒---')
+                    if today_remind_count:
+                        today_remind_count += 1
+                    else:
+                        today_remind_count = 1
                     try:
-                        await delete_note_remind(user_id, uid)
+                        await update_note_remind(user_id, uid, count, remind_group, enable, int(now_time.timestamp()),
+                                                 today_remind_count)
                         if user_id == remind_group:
                             await get_bot().send_private_msg(user_id=user_id,
-                                                             message=f'[CQ:at,qq={user_id}]你的cookie失效了哦,派蒙没办法帮你检查树脂,'
-                                                                     f'请重新添加ck后再叫派蒙开启提醒')
+                                                             message=f'[CQ:at,qq={user_id}]⚠️你的树脂已经达到了{now_data["data"]["current_resin"]},记得清理哦!⚠️')
                         else:
                             await get_bot().send_group_msg(group_id=remind_group,
-                                                           message=f'[CQ:at,qq={user_id}]你的cookie失效了哦,派蒙没办法帮你检查树脂,'
-                                                                   f'请重新添加ck后再叫派蒙开启提醒')
+                                                           message=f'[CQ:at,qq={user_id}]⚠️你的树脂已经达到了{now_data["data"]["current_resin"]},记得清理哦!⚠️')
                     except Exception as e:
                         logger.error(f'---派蒙发送树脂提醒失败:{e}---')
-                else:
-                    if now_data['data']['current_resin'] >= count:
-                        logger.info(f'---用户{user_id}的uid{uid}的树脂已经达到阈值了,发送提醒---')
-                        if today_remind_count:
-                            today_remind_count += 1
-                        else:
-                            today_remind_count = 1
-                        now_time_str = now_time.strftime('%Y%m%d %H:%M:%S')
-                        try:
-                            await update_note_remind(user_id, uid, count, remind_group, enable, now_time_str,
-                                                     today_remind_count)
-                            if user_id == remind_group:
-                                await get_bot().send_private_msg(user_id=user_id,
-                                                                 message=f'[CQ:at,qq={user_id}]⚠️你的树脂已经达到了{now_data["data"]["current_resin"]},记得清理哦!⚠️')
-                            else:
-                                await get_bot().send_group_msg(group_id=remind_group,
-                                                               message=f'[CQ:at,qq={user_id}]⚠️你的树脂已经达到了{now_data["data"]["current_resin"]},记得清理哦!⚠️')
-                        except Exception as e:
-                            logger.error(f'---派蒙发送树脂提醒失败:{e}---')
-                await sleep(random.randint(8, 15))
 
 
 @scheduler.scheduled_job('cron', hour=0, misfire_grace_time=10)
@@ -829,6 +858,7 @@ async def all_update():
     failed_time = 0
     for uid in uid_list:
         try:
+            await rate_limiter.acquire('enka')
             data = await get_enka_data(uid)
             if data:
                 player_info = PlayerInfo(uid)
@@ -838,7 +868,6 @@ async def all_update():
                         player_info.set_role(role)
                 player_info.save()
                 logger.info(f'---派蒙更新{uid}的角色信息成功---')
-            await sleep(random.randint(8, 15))
         except Exception:
             failed_time += 1
             if failed_time > 5:
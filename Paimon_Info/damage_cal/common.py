@@ -1,12 +1,17 @@
 from pathlib import Path
 from typing import Tuple, Dict, Optional, List, Union
 from ...utils.enka_util import get_artifact_suit
+from ...utils.image_util import load_asset, load_font
 from PIL import Image, ImageDraw
-from littlepaimon_utils.files import load_image, load_json
-from littlepaimon_utils.images import get_font, draw_center_text
+from littlepaimon_utils.files import load_json
+from littlepaimon_utils.images import draw_center_text
 
-text_font = str(Path() / 'resources' / 'LittlePaimon' / 'hywh.ttf')
-number_font = str(Path() / 'resources' / 'LittlePaimon' / 'number.ttf')
+text_font = 'hywh.ttf'
+number_font = 'number.ttf'
+
+
+def get_font(size, font):
+    return load_font(font, size)
 
 
 def udc(dm: float,
@@ -859,14 +864,15 @@ def get_damage_multipiler(data: dict) -> dict:
 
 def draw_dmg_pic(dmg: Dict[str, Union[tuple, list]]):
     """
-    绘制伤害图片
+    绘制伤害图片，每次返回新的图片，可以随意修改；伤害数据由角色数据算出，
+    角色卡片整张按角色数据缓存在render_cache中，命中时不会再调用这里
     :param dmg: 伤害字典
     :return: 伤害图片
     """
     # 读取图片资源
-    mask_top = load_image(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩top.png')
-    mask_body = load_image(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩body.png')
-    mask_bottom = load_image(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩bottom.png')
+    mask_top = load_asset(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩top.png')
+    mask_body = load_asset(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩body.png')
+    mask_bottom = load_asset(path=Path() / 'resources' / 'LittlePaimon' / 'player_card2' / '遮罩bottom.png')
     height = 60 * len(dmg) - 20
     # 创建画布
     bg = Image.new('RGBA', (948, height + 80), (0, 0, 0, 0))
@@ -1,17 +1,19 @@
 import datetime
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFont
-from littlepaimon_utils import aiorequests
-from littlepaimon_utils.files import load_image
+from PIL import Image, ImageDraw
 
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import load_asset, load_font, load_icon, prefetch_images
+from ..utils.render_util import render_pool
 
 res_path = Path() / 'resources' / 'LittlePaimon'
+avatar_side_path = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side'
+# 卡片布局或素材改动时加1，使已缓存的卡片图片失效
+template_version = 1
 
 
 def get_font(size, font='msyh.ttc'):
-    return ImageFont.truetype(str(res_path / font), size)
+    return load_font(font, size)
 
 
 def get_open_time(timeStamp1, timeStamp2):
@@ -32,13 +34,13 @@ def get_chan_time(timeStamp1, timeStamp2):
     return f'{date}  结束时间 上{otherStyleTime1} 下{otherStyleTime2}'
 
 
-async def draw_abyss_floor_card(floor, floor_n):
-    floor_img = load_image(res_path / 'abyss' / f'floor{floor_n}_long.png', mode='RGBA')
+def draw_abyss_floor_card(floor, floor_n):
+    floor_img = load_asset(res_path / 'abyss' / f'floor{floor_n}_long.png', mode='RGBA')
     floor_draw = ImageDraw.Draw(floor_img)
     floor_draw.text((590, 68), f"{floor['star']}/9", font=get_font(30), fill='white')
     h, h1, h2 = 188.3, 230, 360
     for j in floor['levels']:
-        star = load_image(res_path / 'abyss' / 'star.png', mode='RGBA')
+        star = load_asset(res_path / 'abyss' / 'star.png', mode='RGBA')
         star_w = 500
         for i in range(0, j['star']):
             floor_img.alpha_composite(star, (star_w, h1 + 94))
@@ -54,7 +56,7 @@ async def draw_abyss_floor_card(floor, floor_n):
             for role in battles[0]['avatars']:
                 id = role['id']
                 level = role['level']
-                role_img = load_image(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
+                role_img = load_asset(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
                 role_draw = ImageDraw.Draw(role_img)
                 role_draw.text((25, 86), f'Lv.{level}', font=get_font(18), fill='black')
                 floor_img.alpha_composite(role_img, (w, h1))
@@ -65,7 +67,7 @@ async def draw_abyss_floor_card(floor, floor_n):
             for role in battles[1]['avatars']:
                 id = role['id']
                 level = role['level']
-                role_img = load_image(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
+                role_img = load_asset(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
                 role_draw = ImageDraw.Draw(role_img)
                 role_draw.text((25, 86), f'Lv.{level}', font=get_font(18), fill='black')
                 floor_img.alpha_composite(role_img, (w, h2))
@@ -86,6 +88,14 @@ async def draw_abyss_card(data, uid, floor_num):
     data = data['data']
     if not data['defeat_rank']:
         return f'uid{uid}没有深渊数据，请打了8-3之后的层数再来!'
+    await prefetch_images(
+        (data[rank][0]['avatar_icon'], avatar_side_path / data[rank][0]['avatar_icon'].split('/')[-1], (60, 60))
+        for rank in ('defeat_rank', 'damage_rank', 'take_damage_rank', 'energy_skill_rank', 'normal_skill_rank'))
+    return await render_pool.render(draw_abyss_img, data, uid, floor_num, quality=75, mode='RGB',
+                                    cache_version=template_version)
+
+
+def draw_abyss_img(data, uid, floor_num):
     total_star = '['
     for d in data['floors']:
         if not d['levels']:
@@ -93,7 +103,7 @@ async def draw_abyss_card(data, uid, floor_num):
         total_star += str(d['star']) + '-'
     total_star = total_star.strip('-') + ']'
     time = (get_open_time(int(data['start_time']), int(data['end_time'])))
-    top_img = load_image(res_path / 'abyss' / 'abyss_total.png', mode='RGBA')
+    top_img = load_asset(res_path / 'abyss' / 'abyss_total.png', mode='RGBA')
     top_draw = ImageDraw.Draw(top_img)
     top_draw.text((15, 22), f'UID：{uid}', font=get_font(21), fill='white')
     top_draw.text((510, 22), time, font=get_font(21), fill='white')
@@ -104,46 +114,46 @@ async def draw_abyss_card(data, uid, floor_num):
     for role in data['reveal_rank']:
         id = role['avatar_id']
         times = role['value']
-        role_img = load_image(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
+        role_img = load_asset(res_path / 'role_card' / f'{id}.png', size=(90, 110), mode='RGBA')
         role_draw = ImageDraw.Draw(role_img)
         role_draw.text((25, 86), f'{times}次', font=get_font(18), fill='black')
         top_img.alpha_composite(role_img, (width, 165))
         width += 150
     defeat_rank = data['defeat_rank'][0]
     avatar_img = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / defeat_rank['avatar_icon'].split('/')[-1]
-    defeat_rank_img = await aiorequests.get_img(url=defeat_rank['avatar_icon'], size=(60, 60), mode='RGBA',
-                                                save_path=avatar_img)
+    defeat_rank_img = load_icon(url=defeat_rank['avatar_icon'], size=(60, 60), mode='RGBA',
+                                save_path=avatar_img)
     top_draw.text((160, 343), str(defeat_rank['value']), font=get_font(21), fill='white')
     top_img.alpha_composite(defeat_rank_img, (280, 320))
 
     damage_rank = data['damage_rank'][0]
     avatar_img = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / damage_rank['avatar_icon'].split('/')[-1]
-    damage_rank_img = await aiorequests.get_img(url=damage_rank['avatar_icon'], size=(60, 60), mode='RGBA',
-                                                save_path=avatar_img)
+    damage_rank_img = load_icon(url=damage_rank['avatar_icon'], size=(60, 60), mode='RGBA',
+                                save_path=avatar_img)
     top_draw.text((495, 343), str(damage_rank['value']), font=get_font(21), fill='white')
     top_img.alpha_composite(damage_rank_img, (590, 320))
 
     take_damage_rank = data['take_damage_rank'][0]
     avatar_img = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / take_damage_rank['avatar_icon'].split('/')[
         -1]
-    take_damage_rank_img = await aiorequests.get_img(url=take_damage_rank['avatar_icon'], size=(60, 60), mode='RGBA',
-                                                     save_path=avatar_img)
+    take_damage_rank_img = load_icon(url=take_damage_rank['avatar_icon'], size=(60, 60), mode='RGBA',
+                                     save_path=avatar_img)
     top_draw.text((180, 389), str(take_damage_rank['value']), font=get_font(21), fill='white')
     top_img.alpha_composite(take_damage_rank_img, (280, 365))
 
     energy_skill_rank = data['energy_skill_rank'][0]
     avatar_img = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / energy_skill_rank['avatar_icon'].split('/')[
         -1]
-    energy_skill_rank_img = await aiorequests.get_img(url=energy_skill_rank['avatar_icon'], size=(60, 60), mode='RGBA',
-                                                      save_path=avatar_img)
+    energy_skill_rank_img = load_icon(url=energy_skill_rank['avatar_icon'], size=(60, 60), mode='RGBA',
+                                      save_path=avatar_img)
     top_draw.text((530, 389), str(energy_skill_rank['value']), font=get_font(21), fill='white')
     top_img.alpha_composite(energy_skill_rank_img, (590, 365))
 
     normal_skill_rank = data['normal_skill_rank'][0]
     avatar_img = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / normal_skill_rank['avatar_icon'].split('/')[
         -1]
-    normal_skill_rank_img = await aiorequests.get_img(url=normal_skill_rank['avatar_icon'], size=(60, 60), mode='RGBA',
-                                                      save_path=avatar_img)
+    normal_skill_rank_img = load_icon(url=normal_skill_rank['avatar_icon'], size=(60, 60), mode='RGBA',
+                                      save_path=avatar_img)
     top_draw.text((195, 435), str(normal_skill_rank['value']), font=get_font(21), fill='white')
     top_img.alpha_composite(normal_skill_rank_img, (280, 410))
 
@@ -155,7 +165,7 @@ async def draw_abyss_card(data, uid, floor_num):
             break
         if not floor['levels']:
             break
-        floor_img = await draw_abyss_floor_card(floor, floor_n)
+        floor_img = draw_abyss_floor_card(floor, floor_n)
         if floor_img:
             floor_img_list.append(floor_img)
     if floor_img_list:
@@ -167,6 +177,6 @@ async def draw_abyss_card(data, uid, floor_num):
             total_img.alpha_composite(floor_img, (5, 5 + 524 + 5 + h))
             h += 1210
 
-        return MessageBuild.Image(total_img, quality=75, mode='RGB')
+        return total_img
     else:
-        return MessageBuild.Image(top_img, quality=75, mode='RGB')
+        return top_img
@@ -4,20 +4,19 @@ from io import BytesIO
 from pathlib import Path
 
 import matplotlib.pyplot as plt
-from PIL import Image, ImageDraw, ImageFont
-from littlepaimon_utils import aiorequests
-from littlepaimon_utils.files import load_image
+from PIL import Image, ImageDraw
 
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import load_asset, load_font, load_icon, prefetch_images
+from ..utils.render_util import render_pool
 
 res_path = Path() / 'resources' / 'LittlePaimon'
 
 
 def get_font(size, font='msyhbd.ttc'):
-    return ImageFont.truetype(str(res_path / font), size)
+    return load_font(font, size)
 
 
-async def draw_ring(per):
+def draw_ring(per):
     if per > 1:
         per = 1
     elif per < 0:
@@ -49,16 +48,22 @@ async def draw_daily_note_card(data, uid):
     elif data['retcode'] != 0:
         return f'派蒙获取{uid}数据失败了，获取状态：\n{data["message"]},{data["retcode"]}'
     data = data['data']
-    circle_img = load_image(res_path / 'daily_note' / '透明圆.png')
-    finished_icon = load_image(res_path / 'daily_note' / 'finished.png')
-    bg_img = load_image(res_path / 'daily_note' / 'ssbq.png', mode='RGBA')
+    await prefetch_images((role['avatar_side_icon'], Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' /
+                           role['avatar_side_icon'].split('/')[-1], (135, 135)) for role in data['expeditions'])
+    return await render_pool.render(draw_daily_note_img, data, uid, size=0.35, quality=70, mode='RGB')
+
+
+def draw_daily_note_img(data, uid):
+    circle_img = load_asset(res_path / 'daily_note' / '透明圆.png')
+    finished_icon = load_asset(res_path / 'daily_note' / 'finished.png')
+    bg_img = load_asset(res_path / 'daily_note' / 'ssbq.png', mode='RGBA')
 
     bg_draw = ImageDraw.Draw(bg_img)
     # uid文字
     bg_draw.text((152, 251), f"uid{uid}", fill='#5680d2', font=get_font(60, 'number.ttf'))
     # 树脂文字
     bg_draw.text((337, 480), f"{data['current_resin']}/160", fill='white', font=get_font(48, 'number.ttf'))
-    bg_img.alpha_composite(await draw_ring(data['current_resin'] / 160), (98, 369))
+    bg_img.alpha_composite(draw_ring(data['current_resin'] / 160), (98, 369))
     if data['current_resin'] == 160:
         bg_draw.text((892, 480), f"树脂满了哦~", fill='white', font=get_font(40, '优设标题黑.ttf'))
     else:
@@ -70,7 +75,7 @@ async def draw_daily_note_card(data, uid):
     bg_draw.text((337, 701), f"{data['current_home_coin']}/{data['max_home_coin']}", fill='white',
                  font=get_font(48, 'number.ttf'))
     bg_img.alpha_composite(
-        await draw_ring(data['current_home_coin'] / data['max_home_coin'] if data['max_home_coin'] != 0 else 1),
+        draw_ring(data['current_home_coin'] / data['max_home_coin'] if data['max_home_coin'] != 0 else 1),
         (98, 593))
     if data['current_home_coin'] == data['max_home_coin']:
         bg_draw.text((820, 701), f"洞天宝钱满了哦~", fill='white', font=get_font(40, '优设标题黑.ttf'))
@@ -87,7 +92,7 @@ async def draw_daily_note_card(data, uid):
         bg_draw.text((762, 701), recover_time_str, fill='white', font=get_font(40, '优设标题黑.ttf'))
     # 委托文字
     bg_draw.text((337, 924), f"{data['finished_task_num']}/4", fill='white', font=get_font(48, 'number.ttf'))
-    bg_img.alpha_composite(await draw_ring(data['finished_task_num'] / 4), (98, 816))
+    bg_img.alpha_composite(draw_ring(data['finished_task_num'] / 4), (98, 816))
     if data['finished_task_num'] == 4:
         bg_draw.text((750, 924), "今日委托已全部完成~", fill='white', font=get_font(40, '优设标题黑.ttf'))
     else:
@@ -96,7 +101,7 @@ async def draw_daily_note_card(data, uid):
     if data['transformer']['obtained']:
         bg_draw.text((337, 1147), f"{7 - data['transformer']['recovery_time']['Day']}/7", fill='white',
                      font=get_font(48, 'number.ttf'))
-        bg_img.alpha_composite(await draw_ring((7 - data['transformer']['recovery_time']['Day']) / 7), (98, 1039))
+        bg_img.alpha_composite(draw_ring((7 - data['transformer']['recovery_time']['Day']) / 7), (98, 1039))
         rt = data['transformer']['recovery_time']
         if rt['Day'] == 0 and rt['reached']:
             bg_draw.text((465, 1147), "可使用", fill='white', font=get_font(40, '优设标题黑.ttf'))
@@ -112,7 +117,7 @@ async def draw_daily_note_card(data, uid):
     # 周本文字
     bg_draw.text((843, 1147), f"{3 - data['remain_resin_discount_num']}/3", fill='white',
                  font=get_font(48, 'number.ttf'))
-    bg_img.alpha_composite(await draw_ring((3 - data['remain_resin_discount_num']) / 3), (604, 1039))
+    bg_img.alpha_composite(draw_ring((3 - data['remain_resin_discount_num']) / 3), (604, 1039))
     if data['remain_resin_discount_num'] == 0:
         bg_draw.text((1005, 1147), "已完成", fill='white', font=get_font(40, '优设标题黑.ttf'))
     else:
@@ -132,7 +137,7 @@ async def draw_daily_note_card(data, uid):
                  font=get_font(48, 'number.ttf'))
     bg_draw.text((745, 1358), f"本期深渊还有{abyss_new.days if abyss_new.days <= abyss_new_total.days else abyss_new_total.days}天结束", fill='white',
                  font=get_font(40, '优设标题黑.ttf'))
-    bg_img.alpha_composite(await draw_ring(abyss_new.days / abyss_new_total.days), (100, 1249))
+    bg_img.alpha_composite(draw_ring(abyss_new.days / abyss_new_total.days), (100, 1249))
 
     # 派遣情况
     exp = data['expeditions']
@@ -141,10 +146,10 @@ async def draw_daily_note_card(data, uid):
         for role in exp:
             role_avatar = Path() / 'data' / 'LittlePaimon' / 'res' / 'avatar_side' / \
                           role['avatar_side_icon'].split('/')[-1]
-            role_avatar = await aiorequests.get_img(url=role['avatar_side_icon'], size=(135, 135), mode='RGBA',
-                                                    save_path=role_avatar)
+            role_avatar = load_icon(url=role['avatar_side_icon'], size=(135, 135), mode='RGBA',
+                                    save_path=role_avatar)
             bg_img.alpha_composite(role_avatar, (i * 200 + 168, 1537))
-            bg_img.alpha_composite(await draw_ring(1 - int(role['remained_time']) / 72000), (i * 201 + 101, 1490))
+            bg_img.alpha_composite(draw_ring(1 - int(role['remained_time']) / 72000), (i * 201 + 101, 1490))
             if role['status'] == 'Ongoing':
                 bg_img.alpha_composite(circle_img, (i * 201 + 172, 1559))
                 hour = int(role['remained_time']) // 3600
@@ -170,8 +175,8 @@ async def draw_daily_note_card(data, uid):
     else:
         bg_draw.text((1408, 1588), '未安排派遣', fill="#5680d2",
                      font=get_font(60, '优设标题黑.ttf'))
-    role_img = load_image(random.choice(list((res_path / 'emoticons').iterdir())), size=3.5, mode='RGBA')
+    role_img = load_asset(random.choice(list((res_path / 'emoticons').iterdir())), size=3.5, mode='RGBA')
     bg_img.alpha_composite(role_img, (1220, 200))
     now = datetime.datetime.now().strftime('%m月%d日%H:%M')
     bg_draw.text((554, 1794), 'Created by LittlePaimon·' + now, fill='#5680d2', font=get_font(40, '优设标题黑.ttf'))
-    return MessageBuild.Image(bg_img, size=0.35, quality=70, mode='RGB')
+    return bg_img
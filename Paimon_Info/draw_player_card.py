@@ -3,17 +3,20 @@ import random
 import re
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFont
-from littlepaimon_utils import aiorequests
-from littlepaimon_utils.files import load_image
+from PIL import Image, ImageDraw
 
+from ..utils.image_util import load_asset, load_font, load_icon, load_template, prefetch_images
 from ..utils.message_util import MessageBuild
+from ..utils.render_util import render_pool
 
 res_path = Path() / 'resources' / 'LittlePaimon'
+res_path2 = Path() / 'data' / 'LittlePaimon' / 'res'
+# 卡片布局或素材改动时加1，使已缓存的卡片图片失效
+template_version = 3
 
 
 def get_font(size):
-    return ImageFont.truetype(str(res_path / 'msyh.ttc'), size)
+    return load_font('msyh.ttc', size)
 
 
 def get_expl_per(percentage):
@@ -27,22 +30,41 @@ def get_expl_per(percentage):
         return ''.join(p) + '%'
 
 
-async def get_chara_card(data):
+def get_weapon_icons(chara_list, size):
+    return [(chara['weapon']['icon'], res_path2 / 'weapon' / chara['weapon']['icon'].split('/')[-1], size)
+            for chara in chara_list]
+
+
+def get_tile_args(data):
+    # 角色小卡片模板的参数：角色、命座(埃洛伊没有)、好感度(旅行者没有)、武器星级
+    return (data['id'], data['actived_constellation_num'] if data['name'] != '埃洛伊' else None,
+            data['fetter'] if data['name'] != '旅行者' else None, data['weapon']['rarity'])
+
+
+def build_chara_tile(chara_id, constellation, fetter, weapon_rarity):
+    """
+    合成ys角色小卡片的模板底图：立绘、底栏、命座、好感度和武器背景
+    """
     chara_card = Image.new("RGBA", (226, 313), (255, 255, 255, 255))
-    chara_img = load_image(res_path / 'role_card' / f'{data["id"]}.png')
+    chara_img = load_asset(res_path / 'role_card' / f'{chara_id}.png')
     chara_card.alpha_composite(chara_img, (0, 0))
-    chara_card.alpha_composite(load_image(res_path / 'player_card' / 'chara_botton.png'), (0, 236))
+    chara_card.alpha_composite(load_asset(res_path / 'player_card' / 'chara_botton.png'), (0, 236))
     # 命座
-    if data['name'] != '埃洛伊':
-        chara_card.alpha_composite(load_image(res_path / 'player_card' / f'命之座{data["actived_constellation_num"]}.png'), (155, 0))
+    if constellation is not None:
+        chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'命之座{constellation}.png'), (155, 0))
     # 好感度
-    if data['name'] != '旅行者':
-        chara_card.alpha_composite(load_image(res_path / 'player_card' / f'好感度{data["fetter"]}.png'), (155, 166))
+    if fetter is not None:
+        chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'好感度{fetter}.png'), (155, 166))
     # 武器背景
-    chara_card.alpha_composite(load_image(res_path / 'player_card' / f'{data["weapon"]["rarity"]}星武器.png'), (0, 227))
+    chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'{weapon_rarity}星武器.png'), (0, 227))
+    return chara_card
+
+
+def get_chara_card(data):
+    chara_card = load_template(build_chara_tile, *get_tile_args(data))
     # 武器图标
     weapon_icon = Path() / 'data' / 'LittlePaimon' / 'res' / 'weapon' / data['weapon']['icon'].split('/')[-1]
-    weapon_icon = await aiorequests.get_img(url=data['weapon']['icon'], size=(63, 63), mode='RGBA', save_path=weapon_icon)
+    weapon_icon = load_icon(url=data['weapon']['icon'], size=(63, 63), mode='RGBA', save_path=weapon_icon)
     chara_card.alpha_composite(weapon_icon, (0, 230))
     # 等级信息
     chara_draw = ImageDraw.Draw(chara_card)
@@ -54,7 +76,7 @@ async def get_chara_card(data):
     return chara_card
 
 
-async def draw_stats_data(bg_draw, stats):
+def draw_stats_data(bg_draw, stats):
     # 第一行
     bg_draw.text((203 - 10 * len(str(stats['active_day_number'])), 475), str(stats['active_day_number']),
                  font=get_font(30), fill='black')
@@ -85,7 +107,7 @@ async def draw_stats_data(bg_draw, stats):
                  font=get_font(30), fill='black')
 
 
-async def draw_homes_data(bg_draw, homes):
+def draw_homes_data(bg_draw, homes):
     bg_draw.text((162 - 10 * len(str(homes['level'])), 1167), str(homes['level']),
                  font=get_font(30), fill='black')
     bg_draw.text((374 - 10 * len(str(homes['comfort_num'])), 1167), str(homes['comfort_num']),
@@ -96,7 +118,7 @@ async def draw_homes_data(bg_draw, homes):
                  font=get_font(30), fill='black')
 
 
-async def draw_world_data(bg_draw, data):
+def draw_world_data(bg_draw, data):
     # 世界探索
     noneExp = {'level': 0, 'exploration_percentage': 0, 'offerings': [{'level': 0}]}
     for d in data['world_explorations']:
@@ -188,30 +210,42 @@ async def draw_player_card(data, chara_data, uid, nickname="旅行者"):
     elif data['retcode'] != 0:
         return f'派蒙获取{uid}数据失败了，获取状态：\n{data["message"]},{data["retcode"]}'
     data = data['data']
-    bg_img = load_image(res_path / 'player_card' / '背景.png', mode='RGBA')
+    chara_list = chara_data['data']['avatars'] if chara_data['data'] else []
+    if chara_list:
+        await prefetch_images(get_weapon_icons(chara_list[:8], (63, 63)))
+        nocha = ''
+    else:
+        nocha = f'*uid{uid}关闭了角色详情显示，派蒙看不到哦'
+    img = await render_pool.render(draw_player_img, data, chara_list, uid, nickname, quality=80,
+                                   cache_version=template_version)
+    return img + MessageBuild.Text(nocha)
+
+
+def draw_player_img(data, chara_list, uid, nickname):
+    bg_img = load_asset(res_path / 'player_card' / '背景.png', mode='RGBA')
     bg_draw = ImageDraw.Draw(bg_img)
-    # 头部名片
-    name_id = random.choice(data['avatars'][0:8])['id']
-    name_card = load_image(res_path / 'name_card' / f'{name_id}.png', crop=(0, 40, 840, 360), size=(846, 360))
-    avatar = load_image(res_path / 'role_profile' / f'{name_id}.png', size=(240, 240))
+    # 头部名片，按uid选取，同一玩家的卡片缓存与重新绘制的结果一致
+    name_id = random.Random(str(uid)).choice(data['avatars'][0:8])['id']
+    name_card = load_asset(res_path / 'name_card' / f'{name_id}.png', crop=(0, 40, 840, 360), size=(846, 360))
+    avatar = load_asset(res_path / 'role_profile' / f'{name_id}.png', size=(240, 240))
     bg_img.alpha_composite(name_card, (57, 27))
     bg_img.alpha_composite(avatar, (360, 25))
-    uid_bg = load_image(res_path / 'player_card' / 'UID_bg.png', size=(280, 100))
+    uid_bg = load_asset(res_path / 'player_card' / 'UID_bg.png', size=(280, 100))
     bg_img.alpha_composite(uid_bg, (340, 247))
     bg_draw.text((354, 259), f'昵称 {nickname}', font=get_font(30), fill='white')
     bg_draw.text((354, 291), f'UID {uid}', font=get_font(30), fill='white')
     # 数据总览
     stats = data['stats']
-    await draw_stats_data(bg_draw, stats)
+    draw_stats_data(bg_draw, stats)
     # 尘歌壶
-    h_lock = load_image(res_path / 'player_card' / '未解锁.png')
+    h_lock = load_asset(res_path / 'player_card' / '未解锁.png')
     homes_list = {'罗浮洞': {'unlock': False, 'posi': (79, 852)}, '清琼岛': {'unlock': False, 'posi': (79, 1000)},
                   '翠黛峰': {'unlock': False, 'posi': (489, 852)}, '绘绮庭': {'unlock': False, 'posi': (489, 1000)}}
     if data['homes']:
         for hl in homes_list.items():
             for h in data['homes']:
                 if hl[0] in h.values():
-                    h_img = load_image(res_path / 'player_card' / f'{hl[0]}.png')
+                    h_img = load_asset(res_path / 'player_card' / f'{hl[0]}.png')
                     bg_img.alpha_composite(h_img, hl[1]['posi'])
                     homes_list[hl[0]]['unlock'] = True
         for hl in homes_list.items():
@@ -220,47 +254,47 @@ async def draw_player_card(data, chara_data, uid, nickname="旅行者"):
         homes = data['homes'][0]
     else:
         homes = {'level': '无数据', 'visit_num': '无数据', 'comfort_num': '无数据', 'item_num': '无数据'}
-    await draw_homes_data(bg_draw, homes)
+    draw_homes_data(bg_draw, homes)
     # 世界探索
-    await draw_world_data(bg_draw, data)
+    draw_world_data(bg_draw, data)
     # 角色
-    nocha = ''
-    if chara_data['data']:
-        chara_data = chara_data['data']['avatars']
-        w = 1045
-        i = 0
-        for chara in chara_data:
-            i += 1
-            chara_card = await get_chara_card(chara)
-            if i <= 4:
-                bg_img.alpha_composite(chara_card.resize((180, 249)), (840 + i * 205, 700))
-            elif 4 < i <= 8:
-                bg_img.alpha_composite(chara_card.resize((180, 249)), (840 + (i - 4) * 205, 974))
-            elif i > 8:
-                break
-    else:
-        nocha = f'*uid{uid}关闭了角色详情显示，派蒙看不到哦'
-    return MessageBuild.Image(bg_img, quality=80) + MessageBuild.Text(nocha)
+    i = 0
+    for chara in chara_list:
+        i += 1
+        if i > 8:
+            break
+        chara_card = get_chara_card(chara)
+        if i <= 4:
+            bg_img.alpha_composite(chara_card.resize((180, 249)), (840 + i * 205, 700))
+        else:
+            bg_img.alpha_composite(chara_card.resize((180, 249)), (840 + (i - 4) * 205, 974))
+    return bg_img
 
 
 # ysa
-async def get_chara_card_long(data):
+def build_chara_tile_long(chara_id, constellation, fetter, weapon_rarity):
+    """
+    合成ysa角色卡片的模板底图：立绘、底栏、命座、好感度和武器背景
+    """
     chara_card = Image.new("RGBA", (226, 382), (255, 255, 255, 255))
-    chara_img = load_image(res_path / 'role_card' / f'{data["id"]}.png')
+    chara_img = load_asset(res_path / 'role_card' / f'{chara_id}.png')
     chara_card.alpha_composite(chara_img, (0, 0))
-    chara_card.alpha_composite(load_image(res_path / 'player_card' / '角色卡底部.png'), (0, 282))
+    chara_card.alpha_composite(load_asset(res_path / 'player_card' / '角色卡底部.png'), (0, 282))
     # 命座
-    if data['name'] != '埃洛伊':
-        actived_constellation_num = load_image(
-            res_path / 'player_card' / f'命之座{data["actived_constellation_num"]}.png')
-        chara_card.alpha_composite(actived_constellation_num, (155, 0))
+    if constellation is not None:
+        chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'命之座{constellation}.png'), (155, 0))
     # 好感度
-    if data['name'] != '旅行者':
-        chara_card.alpha_composite(load_image(res_path / 'player_card' / f'好感度{data["fetter"]}.png'), (155, 166))
+    if fetter is not None:
+        chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'好感度{fetter}.png'), (155, 166))
     # 武器背景
-    chara_card.alpha_composite(load_image(res_path / 'player_card' / f'{data["weapon"]["rarity"]}星武器.png'), (3, 288))
+    chara_card.alpha_composite(load_asset(res_path / 'player_card' / f'{weapon_rarity}星武器.png'), (3, 288))
+    return chara_card
+
+
+def get_chara_card_long(data):
+    chara_card = load_template(build_chara_tile_long, *get_tile_args(data))
     weapon_icon = Path() / 'data' / 'LittlePaimon' / 'res' / 'weapon' / data['weapon']['icon'].split('/')[-1]
-    weapon_icon = await aiorequests.get_img(url=data['weapon']['icon'], size=(62, 62), mode='RGBA', save_path=weapon_icon)
+    weapon_icon = load_icon(url=data['weapon']['icon'], size=(62, 62), mode='RGBA', save_path=weapon_icon)
     chara_card.alpha_composite(weapon_icon, (3, 291))
     # 等级信息
     chara_draw = ImageDraw.Draw(chara_card)
@@ -285,6 +319,22 @@ async def draw_all_chara_card(data, uid):
     elif data['retcode'] != 0:
         return f'派蒙获取{uid}数据失败了，获取状态：\n{data["message"]},{data["retcode"]}'
     data = data['data']['avatars']
+    await prefetch_images(get_weapon_icons(data, (62, 62)))
+    return await render_pool.render(draw_all_chara_img, data, uid, size=0.9, quality=70)
+
+
+def build_all_chara_template(col):
+    """
+    合成ysa卡片的模板底图：col行卡片身体，顶部有头像和UID、底部会盖住最后一行角色卡，都在每次绘制时单独贴上
+    """
+    bg_middle = load_asset(res_path / 'player_card' / '卡片身体.png', size=(1304, 474))
+    bg_img = Image.new('RGBA', (1304, 382 + col * 424 + (col - 1) * 50 + 87), (0, 0, 0, 0))
+    for i in range(0, col):
+        bg_img.paste(bg_middle, (0, 382 + i * 474))
+    return bg_img
+
+
+def draw_all_chara_img(data, uid):
     chara_num = len(data)
     col = int(chara_num / 4)
     if not chara_num % 4 == 0:
@@ -296,34 +346,30 @@ async def draw_all_chara_card(data, uid):
             chara['rarity'] = 4.5
     chara_list = sorted(data, key=lambda i: (
     i['rarity'], i['actived_constellation_num'], i['level'], i['fetter'], i['weapon']['rarity']), reverse=True)
-    bg_top = load_image(res_path / 'player_card' / '卡片顶部.png')
-    avatar = load_image(res_path / 'role_profile' / f'{chara_list[0]["id"]}.png', size=(220, 220))
+    bg_top = load_asset(res_path / 'player_card' / '卡片顶部.png')
+    avatar = load_asset(res_path / 'role_profile' / f'{chara_list[0]["id"]}.png', size=(220, 220))
     bg_top.alpha_composite(avatar, (542, 30))
     draw = ImageDraw.Draw(bg_top)
     draw.text((538, 235), f'UID {uid}', font=get_font(30), fill='black')
 
-    bg_middle = load_image(res_path / 'player_card' / '卡片身体.png', size=(1304, 474))
-    bg_bottom = load_image(res_path / 'player_card' / '卡片底部.png')
-    bg_img = Image.new('RGBA', (1304, 382 + col * 424 + (col - 1) * 50 + 87), (0, 0, 0, 0))
-    bg_img.paste(bg_top, (0, 0))
-    for i in range(0, col):
-        bg_img.paste(bg_middle, (0, 382 + i * 474))
+    bg_img = load_template(build_all_chara_template, col)
+    bg_img.paste(bg_top.crop((0, 0, 1304, 382)), (0, 0))
     n = 0
     for chara in chara_list:
-        chara_card = (await get_chara_card_long(chara)).resize((251, 424))
+        chara_card = get_chara_card_long(chara).resize((251, 424))
         bg_img.alpha_composite(chara_card, (75 + 301 * (n % 4), 390 + 474 * int(n / 4)))
         n += 1
-    bg_img.paste(bg_bottom, (0, 382 + col * 474 - 50))
+    bg_img.paste(load_asset(res_path / 'player_card' / '卡片底部.png'), (0, 382 + col * 474 - 50))
 
-    return MessageBuild.Image(bg_img, size=0.9, quality=70)
+    return bg_img
 
 
 # ysc
-async def draw_reli_icon(data):
-    base_icon = load_image(res_path / 'other' / f'star{data["rarity"]}.png', size=(80, 80))
-    shadow = load_image(res_path / 'other' / 'shadow.png')
+def draw_reli_icon(data):
+    base_icon = load_asset(res_path / 'other' / f'star{data["rarity"]}.png', size=(80, 80))
+    shadow = load_asset(res_path / 'other' / 'shadow.png')
     icon = Path() / 'data' / 'LittlePaimon' / 'res' / 'reli' / data['icon'].split('/')[-1]
-    icon = await aiorequests.get_img(url=data["icon"], size=(80, 80), mode='RGBA', save_path=icon)
+    icon = load_icon(url=data["icon"], size=(80, 80), mode='RGBA', save_path=icon)
     base_icon.alpha_composite(icon, (0, 0))
     base_icon.alpha_composite(shadow, (40, 60))
     base_icon_draw = ImageDraw.Draw(base_icon)
@@ -331,18 +377,18 @@ async def draw_reli_icon(data):
     return base_icon
 
 
-async def draw_const_skill_icon(data, name):
-    base_icon = load_image(res_path / 'other' / '命座.png', size=(65, 65))
+def draw_const_skill_icon(data, name):
+    base_icon = load_asset(res_path / 'other' / '命座.png', size=(65, 65))
     icon = Path() / 'data' / 'LittlePaimon' / 'res' / 'skill' / data['icon'].split('/')[-1]
-    icon = await aiorequests.get_img(url=data["icon"], size=(65, 65), mode='RGBA', save_path=icon)
+    icon = load_icon(url=data["icon"], size=(65, 65), mode='RGBA', save_path=icon)
     base_icon.alpha_composite(icon, (0, 0))
     if 'is_actived' in data and not data['is_actived']:
-        unlock_icon = load_image(res_path / 'other' / '命座未解锁.png', size=(65, 65))
+        unlock_icon = load_asset(res_path / 'other' / '命座未解锁.png', size=(65, 65))
         base_icon.alpha_composite(unlock_icon, (0, 0))
     return base_icon
 
 
-async def draw_line(p):
+def draw_line(p):
     img = Image.new('RGBA', (1000, 80), (255, 255, 255, 0))
     draw = ImageDraw.Draw(img)
     draw.ellipse((840, 0, 880, 80), fill='white')
@@ -378,15 +424,27 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
             break
     if not f:
         return f'{chara_name[0]}不在{uid}公开的8个角色中或没有这个角色哦'
+    icons = get_weapon_icons([character], (100, 100))
+    icons += [(reli['icon'], res_path2 / 'reli' / reli['icon'].split('/')[-1], (80, 80))
+              for reli in character['reliquaries']]
+    skill_list = skill_data['data']['skill_list'] if skill_data and skill_data['retcode'] == 0 else []
+    icons += [(icon['icon'], res_path2 / 'skill' / icon['icon'].split('/')[-1], (65, 65))
+              for icon in skill_list + character['constellations']]
+    await prefetch_images(icons)
+    return await render_pool.render(draw_chara_img, character, skill_data, uid, size=0.95, quality=80, mode='RGB',
+                                    cache_version=template_version)
+
+
+def draw_chara_img(character, skill_data, uid):
     # 立绘
-    bg_img = load_image(res_path / 'name_card' / f'{character["id"]}.png')
+    bg_img = load_asset(res_path / 'name_card' / f'{character["id"]}.png')
     bg_draw = ImageDraw.Draw(bg_img)
     if character['id'] == 10000007:
-        chara_img = load_image(res_path / 'role_splash' / '荧.png', mode='RGBA')
+        chara_img = load_asset(res_path / 'role_splash' / '荧.png', mode='RGBA')
     elif character['id'] == 10000005:
-        chara_img = load_image(res_path / 'role_splash' / '空.png', mode='RGBA')
+        chara_img = load_asset(res_path / 'role_splash' / '空.png', mode='RGBA')
     else:
-        chara_img = load_image(res_path / 'role_splash' / f'{character["name"]}.png', mode='RGBA')
+        chara_img = load_asset(res_path / 'role_splash' / f'{character["name"]}.png', mode='RGBA')
     W, H = chara_img.size
     chara_img = chara_img.resize((int(W * 400 / H), 400))
     bg_img.alpha_composite(chara_img, (0, 0))
@@ -398,23 +456,23 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
     bg_draw.text((260, 128), '亲密', font=get_font(25), fill='white')
     if character['name'] == '旅行者':
         character['fetter'] = 10
-    bg_img.alpha_composite(await draw_line(character['level'] / 90), (330, 92))
-    bg_img.alpha_composite(await draw_line(character['fetter'] / 10), (330, 137))
+    bg_img.alpha_composite(draw_line(character['level'] / 90), (330, 92))
+    bg_img.alpha_composite(draw_line(character['fetter'] / 10), (330, 137))
     bg_draw.text((560, 83), f'Lv.{character["level"]}', font=get_font(25), fill='white')
-    fetter = load_image(res_path / 'player_card' / f'好感度{character["fetter"]}.png', size=(57, 49))
+    fetter = load_asset(res_path / 'player_card' / f'好感度{character["fetter"]}.png', size=(57, 49))
     bg_img.alpha_composite(fetter, (560, 122))
 
     # 武器
-    shadow = load_image(res_path / 'other' / 'shadow.png')
+    shadow = load_asset(res_path / 'other' / 'shadow.png')
 
-    weapon_bg = load_image(res_path / 'other' / f'star{character["weapon"]["rarity"]}.png', size=(100, 100))
+    weapon_bg = load_asset(res_path / 'other' / f'star{character["weapon"]["rarity"]}.png', size=(100, 100))
     weapon_icon = Path() / 'data' / 'LittlePaimon' / 'res' / 'weapon' / character['weapon']['icon'].split('/')[-1]
-    weapon_icon = await aiorequests.get_img(url=character['weapon']['icon'], size=(100, 100), mode='RGBA', save_path=weapon_icon)
+    weapon_icon = load_icon(url=character['weapon']['icon'], size=(100, 100), mode='RGBA', save_path=weapon_icon)
     bg_img.alpha_composite(weapon_bg, (293, 175))
     bg_img.alpha_composite(weapon_icon, (293, 175))
     bg_img.alpha_composite(shadow.resize((50, 25)), (344, 250))
     bg_draw.text((348, 250), f'Lv.{character["weapon"]["level"]}', font=get_font(18), fill='white')
-    weapon_star = load_image(
+    weapon_star = load_asset(
         res_path / 'player_card' / f'命之座{character["weapon"]["affix_level"]}.png', size=(40, 40))
     bg_img.alpha_composite(weapon_star, (353, 175))
 
@@ -422,7 +480,7 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
     reli_p = [(406, 195), (499, 195), (313, 289), (406, 289), (499, 289)]
     i = 0
     for reli in character['reliquaries']:
-        reli_icon = await draw_reli_icon(reli)
+        reli_icon = draw_reli_icon(reli)
         bg_img.alpha_composite(reli_icon, reli_p[i])
         i += 1
 
@@ -453,7 +511,7 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
         skill_p = [(621, 98), (621, 168), (621, 238)]
         skill_data_t = skill_data_['data']['skill_list']
         for skill in skill_data_t[0:2]:
-            skill_icon = await draw_const_skill_icon(skill, character['name'])
+            skill_icon = draw_const_skill_icon(skill, character['name'])
             bg_img.alpha_composite(skill_icon, skill_p[i])
             bg_img.alpha_composite(shadow.resize((50, 25)), (skill_p[i][0] + 69, skill_p[i][1] + 22))
             bg_draw.text((skill_p[i][0] + 73 + (6 if skill["level_current"] < 10 else 0), skill_p[i][1] + 22),
@@ -464,7 +522,7 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
             skill = skill_data_t[3]
         else:
             skill = skill_data_t[2]
-        skill_icon = await draw_const_skill_icon(skill, character['name'])
+        skill_icon = draw_const_skill_icon(skill, character['name'])
         bg_img.alpha_composite(skill_icon, skill_p[i])
         bg_img.alpha_composite(shadow.resize((50, 25)), (skill_p[i][0] + 69, skill_p[i][1] + 22))
         bg_draw.text((skill_p[i][0] + 73 + (6 if skill["level_current"] < 10 else 0), skill_p[i][1] + 22),
@@ -476,10 +534,10 @@ async def draw_chara_card(data, skill_data, chara_name, uid):
     else:
         const_p = [(626, 8), (691, 60), (714, 130), (714, 207), (691, 277), (626, 329)]
     for const in character['constellations']:
-        const_icon = await draw_const_skill_icon(const, character['name'])
+        const_icon = draw_const_skill_icon(const, character['name'])
         bg_img.alpha_composite(const_icon, const_p[i])
         i += 1
 
     bg_draw.text((330, 371), 'Created by LittlePaimon', font=get_font(20), fill='white')
 
-    return MessageBuild.Image(bg_img, size=0.95, quality=80, mode='RGB')
+    return bg_img
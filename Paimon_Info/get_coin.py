@@ -1,9 +1,9 @@
-import asyncio
 import random
 from nonebot import logger
 
-from littlepaimon_utils import aiorequests
 from ..utils.auth_util import random_text, random_hex, get_old_version_ds, get_ds
+from ..utils import http_util
+from ..utils.rate_limit import rate_limiter
 
 # 米游社的API列表
 bbs_Cookieurl = 'https://webapi.account.mihoyo.com/Api/cookie_accountinfo_by_loginticket?login_ticket={}'
@@ -119,7 +119,8 @@ class MihoyoBBSCoin:
         """
         获取任务列表，用来判断做了哪些任务
         """
-        data = await aiorequests.get(url=bbs_Taskslist, headers=self.headers)
+        await rate_limiter.acquire('bbs')
+        data = await http_util.get(url=bbs_Taskslist, headers=self.headers)
         data = data.json()
         if 'err' in data['message'] or data['retcode'] == -100:
             self.state = False
@@ -169,7 +170,8 @@ class MihoyoBBSCoin:
         获取进行操作的帖子列表
         :return: 帖子id列表
         """
-        req = await aiorequests.get(
+        await rate_limiter.acquire('bbs')
+        req = await http_util.get(
             url=bbs_Listurl.format(random.choice([bbs['forumId'] for bbs in self.mihoyo_bbs_List])),
             headers=self.headers)
         data = req.json()
@@ -185,12 +187,12 @@ class MihoyoBBSCoin:
         header = self.headers.copy()
         for i in self.mihoyo_bbs_List:
             header['DS'] = get_ds('', {'gids': i['id']}, True)
-            req = await aiorequests.post(url=bbs_Signurl, json={'gids': i['id']}, headers=header)
+            await rate_limiter.acquire('bbs')
+            req = await http_util.post(url=bbs_Signurl, json={'gids': i['id']}, headers=header)
             data = req.json()
             if 'err' in data['message']:
                 self.state = False
                 return
-            await asyncio.sleep(random.randint(3, 6))
         return '讨论区签到：完成！'
 
     async def read_posts(self):
@@ -201,11 +203,11 @@ class MihoyoBBSCoin:
             return '看帖任务已经完成过了~'
         num_ok = 0
         for i in range(self.Task_do['bbs_Read_posts_num']):
-            req = await aiorequests.get(url=bbs_Detailurl.format(self.postsList[i][0]), headers=self.headers)
+            await rate_limiter.acquire('bbs')
+            req = await http_util.get(url=bbs_Detailurl.format(self.postsList[i][0]), headers=self.headers)
             data = req.json()
             if data['message'] == 'OK':
                 num_ok += 1
-            await asyncio.sleep(random.randint(2, 5))
         return f'浏览帖子：完成{str(num_ok)}个！'
 
     async def like_posts(self):
@@ -217,27 +219,27 @@ class MihoyoBBSCoin:
         num_ok = 0
         num_cancel = 0
         for i in range(self.Task_do['bbs_Like_posts_num']):
-            req = await aiorequests.post(url=bbs_Likeurl,
-                                         headers=self.headers,
-                                         json={
-                                             'post_id':   self.postsList[i][0],
-                                             'is_cancel': False,
-                                         })
+            await rate_limiter.acquire('bbs')
+            req = await http_util.post(url=bbs_Likeurl,
+                                       headers=self.headers,
+                                       json={
+                                           'post_id':   self.postsList[i][0],
+                                           'is_cancel': False,
+                                       })
             data = req.json()
             if data['message'] == 'OK':
                 num_ok += 1
             # 取消点赞
-            await asyncio.sleep(random.randint(1, 3))
-            req = await aiorequests.post(url=bbs_Likeurl,
-                                         headers=self.headers,
-                                         json={
-                                             'post_id':   self.postsList[i][0],
-                                             'is_cancel': True,
-                                         })
+            await rate_limiter.acquire('bbs')
+            req = await http_util.post(url=bbs_Likeurl,
+                                       headers=self.headers,
+                                       json={
+                                           'post_id':   self.postsList[i][0],
+                                           'is_cancel': True,
+                                       })
             data = req.json()
             if data['message'] == 'OK':
                 num_cancel += 1
-        await asyncio.sleep(random.randint(2, 5))
         return f'点赞帖子：完成{str(num_ok)}个并{str(num_cancel)}个！'
 
     async def share_post(self):
@@ -247,12 +249,10 @@ class MihoyoBBSCoin:
         if self.Task_do['bbs_Share']:
             return '分享任务已经完成过了~'
         for _ in range(3):
-            req = await aiorequests.get(
+            await rate_limiter.acquire('bbs')
+            req = await http_util.get(
                 url=bbs_Shareurl.format(self.postsList[0][0]),
                 headers=self.headers)
             data = req.json()
             if data['message'] == 'OK':
                 return '分享帖子：完成！'
-            else:
-                await asyncio.sleep(random.randint(3, 6))
-        await asyncio.sleep(random.randint(2, 5))
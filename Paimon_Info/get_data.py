@@ -1,12 +1,14 @@
 import datetime
 import re
 
-from littlepaimon_utils import aiorequests
 from nonebot import logger
 
 from ..utils.auth_util import get_headers, get_sign_headers, get_use_cookie, get_own_cookie, check_retcode
 from ..utils.db_util import get_private_cookie, update_cookie_cache, update_private_cookie
 from ..utils.decorator import cache
+from ..utils import http_util
+
+enka_mirrors = http_util.MirrorGroup(['https://enka.network', 'https://enka.microgg.cn'])
 
 
 async def get_abyss_data(user_id, uid, schedule_type="1", use_cache=True):
@@ -23,7 +25,7 @@ async def get_abyss_data(user_id, uid, schedule_type="1", use_cache=True):
         headers = get_headers(q=f'role_id={uid}&schedule_type={schedule_type}&server={server_id}',
                               cookie=cookie['cookie'])
 
-        resp = await aiorequests.get(url=url, headers=headers, params=params)
+        resp = await http_util.get(url=url, headers=headers, params=params)
         data = resp.json()
         check = await check_retcode(data, cookie, uid)
         if check == '私人cookie达到了每日30次查询上限':
@@ -44,7 +46,7 @@ async def get_daily_note_data(uid):
         "server":  server_id,
         "role_id": uid
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     if await check_retcode(data, cookie, uid):
         return data
@@ -52,7 +54,8 @@ async def get_daily_note_data(uid):
         return f'你的uid{uid}的cookie已过期,需要重新绑定哦!'
 
 
-@cache(ttl=datetime.timedelta(hours=1))
+@cache(ttl=datetime.timedelta(hours=1), persist='player_card', hard_ttl=datetime.timedelta(hours=12),
+       arg_key='uid')
 async def get_player_card_data(user_id, uid, use_cache=True):
     server_id = "cn_qd01" if uid[0] == '5' else "cn_gf01"
     url = "https://api-takumi-record.mihoyo.com/game_record/app/genshin/api/index"
@@ -65,7 +68,7 @@ async def get_player_card_data(user_id, uid, use_cache=True):
         if not cookie:
             return '现在派蒙没有可以用的cookie哦，可能是:\n1.公共cookie全都达到了每日30次上限\n2.公共池全都失效了或没有cookie\n让管理员使用 添加公共ck 吧!'
         headers = get_headers(q=f'role_id={uid}&server={server_id}', cookie=cookie['cookie'])
-        resp = await aiorequests.get(url=url, headers=headers, params=params)
+        resp = await http_util.get(url=url, headers=headers, params=params)
         data = resp.json()
         check = await check_retcode(data, cookie, uid)
         if check == '私人cookie达到了每日30次查询上限':
@@ -74,7 +77,8 @@ async def get_player_card_data(user_id, uid, use_cache=True):
             return data
 
 
-@cache(ttl=datetime.timedelta(hours=1))
+@cache(ttl=datetime.timedelta(hours=1), persist='chara_detail', hard_ttl=datetime.timedelta(hours=12),
+       arg_key='uid')
 async def get_chara_detail_data(user_id, uid, use_cache=True):
     server_id = "cn_qd01" if uid[0] == '5' else "cn_gf01"
     json_data = {
@@ -88,7 +92,7 @@ async def get_chara_detail_data(user_id, uid, use_cache=True):
         if not cookie:
             return '现在派蒙没有可以用的cookie哦，可能是:\n1.公共cookie全都达到了每日30次上限\n2.公共池全都失效了或没有cookie\n让管理员使用 添加公共ck 吧!'
         headers = get_headers(b=json_data, cookie=cookie['cookie'])
-        resp = await aiorequests.post(url=url, headers=headers, json=json_data)
+        resp = await http_util.post(url=url, headers=headers, json=json_data)
         data = resp.json()
         check = await check_retcode(data, cookie, uid)
         if check == '私人cookie达到了每日30次查询上限':
@@ -97,7 +101,7 @@ async def get_chara_detail_data(user_id, uid, use_cache=True):
             return data
 
 
-@cache(ttl=datetime.timedelta(hours=1))
+@cache(ttl=datetime.timedelta(hours=1), persist='chara_skill')
 async def get_chara_skill_data(uid, chara_id, use_cache=True):
     server_id = "cn_qd01" if uid[0] == '5' else "cn_gf01"
     url = 'https://api-takumi.mihoyo.com/event/e20200928calculate/v1/sync/avatar/detail'
@@ -111,12 +115,12 @@ async def get_chara_skill_data(uid, chara_id, use_cache=True):
         "uid":       uid,
         "avatar_id": chara_id
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     return data
 
 
-@cache(ttl=datetime.timedelta(hours=1))
+@cache(ttl=datetime.timedelta(hours=1), persist='month_info')
 async def get_monthinfo_data(uid, month, use_cache=True):
     server_id = "cn_qd01" if uid[0] == '5' else "cn_gf01"
     url = 'https://hk4e-api.mihoyo.com/event/ys_ledger/monthInfo'
@@ -130,7 +134,7 @@ async def get_monthinfo_data(uid, month, use_cache=True):
         "bind_uid":    uid,
         "bind_region": server_id
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     if await check_retcode(data, cookie, uid):
         return data
@@ -150,7 +154,7 @@ async def get_bind_game(cookie):
     params = {
         "uid": uid
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     return data, uid
 
@@ -201,7 +205,7 @@ async def get_sign_info(uid):
         'region': server_id,
         'uid':    uid
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     if await check_retcode(data, cookie, uid):
         return data
@@ -222,7 +226,7 @@ async def sign(uid):
         'uid':    uid,
         'region': server_id
     }
-    resp = await aiorequests.post(url=url, headers=headers, json=json_data)
+    resp = await http_util.post(url=url, headers=headers, json=json_data)
     data = resp.json()
     logger.info(f'---UID{uid}的签到状态码为{data["retcode"]}，结果为{data["message"]}---')
     if await check_retcode(data, cookie, uid):
@@ -244,29 +248,21 @@ async def get_sign_list():
     params = {
         'act_id': 'e202009291139501'
     }
-    resp = await aiorequests.get(url=url, headers=headers, params=params)
+    resp = await http_util.get(url=url, headers=headers, params=params)
     data = resp.json()
     return data
 
 
 async def get_enka_data(uid):
-    try:
-        url = f'https://enka.network/u/{uid}/__data.json'
-        resp = await aiorequests.get(url=url, headers={'User-Agent': 'LittlePaimon/2.0'}, follow_redirects=True)
-        data = resp.json()
-        return data
-    except Exception:
-        url = f'https://enka.microgg.cn/u/{uid}/__data.json'
-        resp = await aiorequests.get(url=url, headers={'User-Agent': 'LittlePaimon/2.0'}, follow_redirects=True)
-        data = resp.json()
-        return data
+    return await enka_mirrors.get_json(f'/u/{uid}/__data.json', headers={'User-Agent': 'LittlePaimon/2.0'},
+                                       follow_redirects=True)
 
 
 async def get_stoken_by_login_ticket(loginticket, mys_id):
-    req = await aiorequests.get(url='https://api-takumi.mihoyo.com/auth/api/getMultiTokenByLoginTicket',
-                                params={
-                                    'login_ticket': loginticket,
-                                    'token_types':  '3',
-                                    'uid':          mys_id
-                                })
+    req = await http_util.get(url='https://api-takumi.mihoyo.com/auth/api/getMultiTokenByLoginTicket',
+                              params={
+                                  'login_ticket': loginticket,
+                                  'token_types':  '3',
+                                  'uid':          mys_id
+                              })
     return req.json()
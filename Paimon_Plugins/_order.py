@@ -6,7 +6,6 @@ import re
 import sys
 from typing import Dict, TypedDict
 
-import aiohttp
 import lxml.html
 from littlepaimon_utils.tools import FreqLimiter
 from nonebot import on_command
@@ -14,6 +13,8 @@ from nonebot.adapters.onebot.v11 import Message, MessageEvent, MessageSegment
 from nonebot.params import CommandArg
 from nonebot.plugin import PluginMetadata
 
+from ..utils import http_util
+
 
 __plugin_meta__ = PluginMetadata(
     name="点餐",
@@ -55,14 +56,15 @@ class base():
         }
 
     async def request(self, method: str, url: str, ctype: str, **kwargs) -> str:
-        async with aiohttp.ClientSession(headers=self.default_haaders, raise_for_status=True) as session:
-            async with session.request(method, url, **kwargs) as resp:
-                if ctype == 'text':
-                    ret = await resp.text()
-                elif ctype == 'json':
-                    ret = await resp.json(content_type=None)
-                else:
-                    raise Exception('Unknow content type')
+        # 原来用aiohttp请求时会自动跟随重定向，httpx默认不跟随
+        resp = await http_util.request(method, url, headers=self.default_haaders, follow_redirects=True, **kwargs)
+        resp.raise_for_status()
+        if ctype == 'text':
+            ret = resp.text
+        elif ctype == 'json':
+            ret = resp.json()
+        else:
+            raise Exception('Unknow content type')
         return ret
 
     async def order(self, name: str) -> TypeFood:
@@ -45,14 +45,14 @@ async def addGroup(bot: Bot, event: GroupRequestEvent):
 
 @notice_handle.handle()
 async def FriendNew(bot: Bot, event: FriendAddNoticeEvent):
-    greet_emoticon = MessageBuild.Image(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-干杯.png', mode='RGBA')
+    greet_emoticon = await MessageBuild.AsyncImage(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-干杯.png', mode='RGBA')
     await sleep(random.randint(4, 8))
     await bot.send_private_msg(user_id=event.user_id, message=Message(MessageSegment.text('旅行者你好呀~，这里是小派蒙，对我说help查看帮助吧~\n') + greet_emoticon))
 
 
 @notice_handle.handle()
 async def GroupNewMember(bot: Bot, event: GroupIncreaseNoticeEvent):
-    greet_emoticon = MessageBuild.Image(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-干杯.png', mode='RGBA')
+    greet_emoticon = await MessageBuild.AsyncImage(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-干杯.png', mode='RGBA')
     if event.user_id == event.self_id:
         await sleep(random.randint(4, 8))
         await bot.send_group_msg(group_id=event.group_id, message=Message(
@@ -68,14 +68,14 @@ async def GroupTalkative(bot: Bot, event: HonorNotifyEvent):
     if event.group_id not in config.paimon_greet_ban and event.honor_type == 'talkative':
         await sleep(random.randint(4, 8))
         if event.user_id == event.self_id:
-            honor_emoticon = MessageBuild.Image(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-哼哼.png',
-                                                mode='RGBA')
+            honor_emoticon = await MessageBuild.AsyncImage(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-哼哼.png',
+                                                           mode='RGBA')
             text = random.choice(['诶嘿~本应急食品是龙王~~', '哦豁，派蒙又是龙王，你们好逊哦(', '怎么回事，你们这么多人居然说不过我一个应急食品?~', '请叫我龙王派蒙~诶嘿'])
             await bot.send_group_msg(group_id=event.group_id,
                                      message=Message(MessageSegment.text(text) + honor_emoticon))
         elif random.random() <= 0.5:
-            honor2_emoticon = MessageBuild.Image(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-黑线.png',
-                                                 mode='RGBA')
+            honor2_emoticon = await MessageBuild.AsyncImage(Path() / 'resources' / 'LittlePaimon' / 'emoticons' / '派蒙-黑线.png',
+                                                            mode='RGBA')
             text = random.choice(['怎么这人比我派蒙话还多!!', '咦~是个话唠龙王(', '好气哦，怎么能抢我派蒙的龙王啊!!'])
             await bot.send_group_msg(group_id=event.group_id,
                                      message=Message(MessageSegment.at(event.user_id) + MessageSegment.text(text) + honor2_emoticon))
@@ -8,7 +8,8 @@ from nonebot.adapters.onebot.v11 import MessageEvent
 from nonebot.params import Depends
 from nonebot.plugin import PluginMetadata
 
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import load_font
+from ..utils.render_util import render_pool
 
 __plugin_meta__ = PluginMetadata(
     name="帮助菜单",
@@ -31,12 +32,11 @@ help_.__paimon_help__ = {
     "priority":  99
 }
 
-font_path = Path() / 'resources' / 'LittlePaimon'
 res_path = Path() / 'resources' / 'LittlePaimon' / 'help'
 
 
 def get_font(size, font='hywh.ttf') -> ImageFont:
-    return ImageFont.truetype(str(font_path / font), size=size)
+    return load_font(font, size)
 
 
 # 绘制带阴影的文字
@@ -102,7 +102,7 @@ def draw_help_info(help_info: dict):
         img.alpha_composite(table, (50, n))
         n += 170 + row * 160
     draw_shadow_text(draw, (800, n + 15), 'Created by LittlePaimon', get_font(50), (255, 255, 255), (0, 0, 0, 255), (2, 2))
-    return MessageBuild.Image(img, size=0.7, mode='RGB', quality=80)
+    return img
 
 
 async def get_all_plugin(event: MessageEvent) -> dict:
@@ -146,4 +146,4 @@ async def get_all_plugin(event: MessageEvent) -> dict:
 
 @help_.handle()
 async def _(event: MessageEvent, help_info: dict = Depends(get_all_plugin)):
-    await help_.finish(draw_help_info(help_info))
+    await help_.finish(await render_pool.render(draw_help_info, help_info, size=0.7, mode='RGB', quality=80))
@@ -1,22 +1,27 @@
 from pathlib import Path
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 
 from .abyss_rate_data import get_rate, get_formation_rate
 from ..utils.alias_handler import get_id_by_name
-from ..utils.message_util import MessageBuild
+from ..utils.image_util import load_font
+from ..utils.render_util import render_pool
 
 res_path = Path() / 'resources' / 'LittlePaimon'
 
 
 def get_font(size, font_type='msyh.ttc'):
-    return ImageFont.truetype(str(res_path / font_type), size)
+    return load_font(font_type, size)
 
 
 async def draw_rate_rank(type: str = 'role', mode: str = 'used'):
     data = await get_rate(type)
     if not data or data['code'] != '200':
         return '获取工坊数据失败，请稍后再试'
+    return await render_pool.render(draw_rate_rank_img, data, quality=75)
+
+
+def draw_rate_rank_img(data):
     col = int(len(data['result']['rateList']) / 5) if len(data['result']['rateList']) % 5 == 0 else int(len(data['result']['rateList']) / 5) + 1
     top_img = Image.open(res_path / 'player_card' / '卡片顶部无字.png').resize((1080, 316))
     body_img = Image.open(res_path / 'player_card' / '卡片身体.png').resize((1080, 226))
@@ -38,13 +43,17 @@ async def draw_rate_rank(type: str = 'role', mode: str = 'used'):
         bg_img.alpha_composite(role_img, (50 + 204 * (n % 5), 180 + 240 * int(n / 5)))
         n += 1
 
-    return MessageBuild.Image(bg_img, quality=75)
+    return bg_img
 
 
 async def draw_teams_rate(floor='上半半'):
     data = await get_formation_rate(1 if floor == '上半' else 2)
     if not data or data['code'] != '200':
         return '获取工坊数据失败，请稍后再试'
+    return await render_pool.render(draw_teams_rate_img, data, floor, quality=75)
+
+
+def draw_teams_rate_img(data, floor):
     rateList = data['result']['rateList'][0:10]
     top_img = Image.open(res_path / 'player_card' / '卡片顶部无字.png').resize((1080, 316))
     body_img = Image.open(res_path / 'player_card' / '卡片身体.png').resize((1080, 240))
@@ -74,5 +83,5 @@ async def draw_teams_rate(floor='上半半'):
             r += 1
         n += 1
 
-    return MessageBuild.Image(bg_img, quality=75)
+    return bg_img
 
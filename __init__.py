@@ -8,6 +8,15 @@ from nonebot import get_driver, logger
 
 driver = get_driver()
 
+
+@driver.on_startup
+async def _():
+    # 最先注册的启动任务：所有插件都已导入完，其他启动任务还没有创建数据库、绘图等线程，在这里fork出绘图进程；
+    # 在函数内导入，保证这个任务比utils中各模块的启动任务先注册
+    from .utils.render_util import render_pool
+    render_pool.start()
+
+
 resource_list = load_json(path=Path(__file__).parent / 'resource_list.json')
 old_resource_path = Path(__file__).parent / 'res'
 new_resource_path = Path().cwd() / 'resources' / 'LittlePaimon'
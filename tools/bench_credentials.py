@@ -0,0 +1,113 @@
+"""
+cookie查找的基准测试，只依赖标准库，不需要启动派蒙
+
+按 utils/db_schema.py 的迁移建出与线上相同的 user_data.db 结构(包括第3版为凭据列建立的索引)，
+在 private_cookies 和 cookie_cache 中分别写入不同数量的绑定账号，再随机查找，统计每次查找的平均耗时；
+查找语句与 get_private_cookie、get_private_stoken、get_cookie_cache 的SQL查找一致(现在它们先查内存中的凭据索引，
+该索引启动时从这两张表载入)，delete_cookie 等删除语句也按这些列查找。
+有索引时耗时应基本不随账号数增长，加上 --no-index 可以对比删除索引后的全表扫描
+
+用法：
+    python tools/bench_credentials.py --sizes 100,1000,10000,100000 --lookups 2000
+    python tools/bench_credentials.py --no-index
+"""
+import argparse
+import importlib.util
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SCHEMA_PATH = Path(__file__).parent.parent / 'utils' / 'db_schema.py'
+
+# (名称, 查找语句, 用第几列的值查找)，列的顺序见seed中的账号
+LOOKUPS = [
+    ('private by user_id', 'SELECT user_id, cookie, uid, mys_id FROM private_cookies WHERE user_id=?;', 0),
+    ('private by uid', 'SELECT user_id, cookie, uid, mys_id FROM private_cookies WHERE uid=?;', 1),
+    ('private by mys_id', 'SELECT user_id, cookie, uid, mys_id FROM private_cookies WHERE mys_id=?;', 2),
+    ('private by cookie', 'SELECT user_id, uid, mys_id FROM private_cookies WHERE cookie=?;', 3),
+    ('cache by uid', 'SELECT cookie FROM cookie_cache WHERE uid=?;', 1),
+    ('cache by cookie', 'SELECT uid FROM cookie_cache WHERE cookie=?;', 3),
+]
+
+
+def load_schema():
+    # 直接按文件加载，不导入派蒙的包，避免需要nonebot
+    spec = importlib.util.spec_from_file_location('db_schema', SCHEMA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_db(path: Path, index: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    load_schema().upgrade(conn)
+    conn.execute('COMMIT;')
+    if not index:
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%';")]
+        for name in names:
+            conn.execute(f'DROP INDEX {name};')
+    return conn
+
+
+def seed(conn: sqlite3.Connection, size: int) -> List[Tuple[str, str, str, str]]:
+    accounts = [(str(10000 + i), str(100000000 + i), str(200000000 + i),
+                 f'ltuid={200000000 + i}; cookie_token={random.getrandbits(128):032x}') for i in range(size)]
+    conn.execute('BEGIN;')
+    conn.executemany('INSERT INTO private_cookies (user_id, uid, mys_id, cookie, stoken) VALUES (?, ?, ?, ?, ?);',
+                     [(user_id, uid, mys_id, cookie, f'stoken={user_id}') for user_id, uid, mys_id, cookie in accounts])
+    conn.executemany('INSERT INTO cookie_cache (uid, mys_id, cookie) VALUES (?, ?, ?);',
+                     [(uid, mys_id, cookie) for _, uid, mys_id, cookie in accounts])
+    conn.execute('COMMIT;')
+    conn.execute('ANALYZE;')
+    return accounts
+
+
+def bench(conn: sqlite3.Connection, accounts: List[Tuple[str, str, str, str]], lookups: int) -> Dict[str, float]:
+    result = {}
+    for name, sql, column in LOOKUPS:
+        keys = [random.choice(accounts)[column] for _ in range(lookups)]
+        start = time.perf_counter()
+        for key in keys:
+            conn.execute(sql, (key,)).fetchall()
+        result[name] = (time.perf_counter() - start) / lookups * 1e6
+    return result
+
+
+def query_plans(conn: sqlite3.Connection) -> Dict[str, str]:
+    return {name: ' / '.join(row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', ('0',)))
+            for name, sql, _ in LOOKUPS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cookie查找的基准测试')
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help='绑定账号数，逗号分隔')
+    parser.add_argument('--lookups', type=int, default=2000, help='每种查找的次数')
+    parser.add_argument('--no-index', action='store_true', help='删除索引，对比全表扫描')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes:
+            conn = create_db(Path(temp_dir) / f'user_data_{size}.db', index=not args.no_index)
+            accounts = seed(conn, size)
+            results[size] = bench(conn, accounts, args.lookups)
+            if size == sizes[-1]:
+                plans = query_plans(conn)
+            conn.close()
+
+    width = max(len(name) for name, _, _ in LOOKUPS)
+    print(f'{"lookup (us)":<{width}}' + ''.join(f'{size:>10}' for size in sizes))
+    for name, _, _ in LOOKUPS:
+        print(f'{name:<{width}}' + ''.join(f'{results[size][name]:>10.1f}' for size in sizes))
+    print()
+    for name, plan in plans.items():
+        print(f'{name:<{width}}  {plan}')
+
+
+if __name__ == '__main__':
+    main()
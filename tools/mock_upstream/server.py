@@ -0,0 +1,207 @@
+"""
+米游社、enka、抽卡记录等上游接口的本地替身服务器，只依赖标准库
+
+回放：按 fixtures/<域名>/<路径>/<请求方法>.json 返回录制好的响应，路径中的数字段(如uid)可以用 _ 通配
+录制：加上 --record 时，没有对应fixture的请求会转发给真实接口，并把响应保存为fixture
+
+让派蒙改为请求替身服务器，在 .env 中设置：
+    paimon_upstream_proxy = "http://127.0.0.1:8710"
+派蒙的请求 https://api-takumi.mihoyo.com/xxx 会被改写为 http://127.0.0.1:8710/api-takumi.mihoyo.com/xxx
+
+用法：
+    python tools/mock_upstream/server.py --port 8710 --latency 200 --jitter 100 --error-rate 0.05 \\
+        --retcode 10101 --retcode-rate 0.1
+
+运行中可以通过 POST /__control 修改 latency、jitter、error_rate、retcode、retcode_rate，
+GET /__stats 查看各接口的请求次数
+
+冒烟测试(启动替身服务器并经http_util检查fixture能原样取回)：
+    python tools/mock_upstream/smoke_test.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+RETCODE_MESSAGES = {
+    10001: '请登录后重试',
+    10101: '每日查询次数已达上限',
+    -100:  '登录失效，请重新登录',
+}
+
+
+class Settings:
+
+    def __init__(self, latency: float = 0, jitter: float = 0, error_rate: float = 0, retcode: int = 10101,
+                 retcode_rate: float = 0, record: bool = False, fixtures: Path = FIXTURES):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retcode = retcode
+        self.retcode_rate = retcode_rate
+        self.record = record
+        self.fixtures = fixtures
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def update(self, values: Dict[str, Any]):
+        for key in ('latency', 'jitter', 'error_rate', 'retcode', 'retcode_rate'):
+            if key in values:
+                setattr(self, key, type(getattr(self, key))(values[key]))
+
+    def dump(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in ('latency', 'jitter', 'error_rate', 'retcode', 'retcode_rate')}
+
+
+def find_fixture(root: Path, host: str, path: str, method: str) -> Optional[Path]:
+    """
+    先找完全匹配的fixture，找不到时把纯数字的路径段替换为 _ 再找
+    """
+    parts = [p for p in path.split('/') if p]
+    for candidate in (parts, ['_' if p.isdigit() else p for p in parts]):
+        file = root.joinpath(host, *candidate, f'{method}.json')
+        if file.is_file():
+            return file
+    return None
+
+
+def paginate(host: str, path: str, query: Dict[str, str], body: Any) -> Any:
+    """
+    抽卡记录和米游币商品列表按请求参数分页，fixture中保存的是完整列表
+    """
+    if path.endswith('/gacha_info/api/getGachaLog'):
+        size = int(query.get('size', 20))
+        end_id = query.get('end_id', '0')
+        gacha_type = query.get('gacha_type')
+        items = [i for i in body['data']['list'] if not gacha_type or i.get('gacha_type') == gacha_type]
+        if end_id != '0':
+            ids = [i['id'] for i in items]
+            items = items[ids.index(end_id) + 1:] if end_id in ids else []
+        body = dict(body, data=dict(body['data'], list=items[:size], page=query.get('page', '1'), size=str(size)))
+    elif path.endswith('/mall/v1/web/goods/list'):
+        size = int(query.get('page_size', 20))
+        page = int(query.get('page', 1))
+        items = body['data']['list'][(page - 1) * size:page * size]
+        body = dict(body, data=dict(body['data'], list=items))
+    return body
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    settings: Settings
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Any):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _split(self) -> Tuple[str, str, Dict[str, str], str]:
+        url = urlsplit(self.path)
+        host, _, path = url.path.lstrip('/').partition('/')
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return host, '/' + path, query, url.query
+
+    def _forward(self, host: str, path: str, raw_query: str, body: bytes) -> Tuple[int, Any]:
+        url = f'https://{host}{path}' + (f'?{raw_query}' if raw_query else '')
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in ('host', 'content-length', 'connection')}
+        req = urllib.request.Request(url, data=body or None, headers=headers, method=self.command)
+        try:
+            with urllib.request.urlopen(req, timeout=20) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b'null')
+
+    def _handle(self):
+        settings = self.settings
+        body = self._read_body()
+        if self.path.startswith('/__control'):
+            if self.command == 'POST' and body:
+                settings.update(json.loads(body))
+            return self._send(200, settings.dump())
+        if self.path.startswith('/__stats'):
+            return self._send(200, dict(settings.stats))
+
+        host, path, query, raw_query = self._split()
+        with settings.lock:
+            settings.stats[f'{self.command} {host}{path}'] += 1
+        if settings.latency or settings.jitter:
+            time.sleep(max(0.0, settings.latency + random.uniform(-settings.jitter, settings.jitter)) / 1000)
+        if random.random() < settings.error_rate:
+            return self._send(500, {'message': 'injected error'})
+        if 'mihoyo.com' in host and random.random() < settings.retcode_rate:
+            return self._send(200, {'retcode': settings.retcode,
+                                    'message': RETCODE_MESSAGES.get(settings.retcode, 'error'), 'data': None})
+
+        fixture = find_fixture(settings.fixtures, host, path, self.command)
+        if fixture is None:
+            if not settings.record:
+                return self._send(404, {'message': f'no fixture for {self.command} {host}{path}'})
+            status, data = self._forward(host, path, raw_query, body)
+            if status == 200:
+                fixture = settings.fixtures.joinpath(host, *[p for p in path.split('/') if p], f'{self.command}.json')
+                fixture.parent.mkdir(parents=True, exist_ok=True)
+                fixture.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+            return self._send(status, data)
+        data = json.loads(fixture.read_text(encoding='utf-8'))
+        return self._send(200, paginate(host, path, query, data))
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+def serve(host: str = '127.0.0.1', port: int = 8710, **kwargs) -> ThreadingHTTPServer:
+    """
+    在后台线程启动替身服务器，供测试或压测脚本直接调用，返回的server用shutdown()关闭
+    """
+    handler = type('BoundHandler', (Handler,), {'settings': Settings(**kwargs)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='米游社/enka/抽卡记录接口的本地替身服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8710)
+    parser.add_argument('--latency', type=float, default=0, help='每个请求的延迟(毫秒)')
+    parser.add_argument('--jitter', type=float, default=0, help='延迟的随机浮动范围(毫秒)')
+    parser.add_argument('--error-rate', type=float, default=0, help='返回HTTP 500的概率')
+    parser.add_argument('--retcode', type=int, default=10101, choices=sorted(RETCODE_MESSAGES),
+                        help='模拟的米游社错误码')
+    parser.add_argument('--retcode-rate', type=float, default=0, help='米游社接口返回错误码的概率')
+    parser.add_argument('--record', action='store_true', help='没有fixture时转发给真实接口并保存响应')
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES)
+    args = parser.parse_args()
+    handler = type('BoundHandler', (Handler,), {'settings': Settings(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, retcode=args.retcode,
+        retcode_rate=args.retcode_rate, record=args.record, fixtures=args.fixtures)})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f'替身服务器已启动: http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
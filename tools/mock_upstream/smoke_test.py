@@ -0,0 +1,75 @@
+"""
+替身服务器的冒烟测试：在随机端口启动替身服务器，让派蒙的http_util改为请求它，
+检查米游社和enka的fixture能经http_util.get原样取回，且替身范围外的站点不会被改写
+
+用法(需要安装派蒙的依赖，nonebot使用的驱动器也要已安装)：
+    python tools/mock_upstream/smoke_test.py
+"""
+import asyncio
+import importlib
+import json
+import sys
+import types
+from pathlib import Path
+
+import nonebot
+
+sys.path.insert(0, str(Path(__file__).parent))
+from server import FIXTURES, serve  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+
+# (请求的url, params, 应取回的fixture)
+CASES = [
+    ('https://api-takumi-record.mihoyo.com/game_record/app/genshin/api/index',
+     {'server': 'cn_gf01', 'role_id': '100000001'},
+     FIXTURES / 'api-takumi-record.mihoyo.com' / 'game_record' / 'app' / 'genshin' / 'api' / 'index' / 'GET.json'),
+    ('https://enka.network/u/100000001/__data.json', None,
+     FIXTURES / 'enka.network' / 'u' / '_' / '__data.json' / 'GET.json'),
+]
+
+# 不在替身范围内，不应被改写的url
+PASSTHROUGH = [
+    'https://upload-bbs.mihoyo.com/game_record/genshin/equip/UI_RelicIcon_10001_4.png',
+    'https://static.cherishmoon.fun/LittlePaimon/DailyMaterials/周一周四.jpg',
+    'https://www.xinshipu.com/doSearch.html?keyword=派蒙',
+]
+
+
+def import_http_util():
+    # 只导入派蒙的utils，不执行插件的__init__，免得加载全部插件
+    package = types.ModuleType('paimon_smoke')
+    package.__path__ = [str(ROOT)]
+    sys.modules['paimon_smoke'] = package
+    return importlib.import_module('paimon_smoke.utils.http_util')
+
+
+async def run(http_util, server_url: str):
+    try:
+        for url, params, fixture in CASES:
+            resp = await http_util.get(url, params=params)
+            assert resp.status_code == 200, f'{url}: HTTP {resp.status_code}'
+            assert resp.json() == json.loads(fixture.read_text(encoding='utf-8')), f'{url}: 响应与fixture不一致'
+            print(f'ok  {url}')
+        stats = (await http_util.get(f'{server_url}/__stats')).json()
+        assert sum(stats.values()) == len(CASES), f'替身服务器收到的请求数不对: {stats}'
+        for url in PASSTHROUGH:
+            assert http_util._proxied(url) == url, f'{url} 不应被改写'
+            print(f'ok  {url} (不改写)')
+    finally:
+        await http_util.registry.close()
+
+
+def main():
+    server = serve(port=0)
+    server_url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        nonebot.init(paimon_upstream_proxy=server_url)
+        asyncio.run(run(import_http_util(), server_url))
+    finally:
+        server.shutdown()
+    print('替身服务器冒烟测试通过')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,11 @@ import string
 from collections import defaultdict
 from time import time
 
-from littlepaimon_utils import aiorequests
 from nonebot import logger
 
-from .db_util import get_cookie_cache, update_cookie_cache, delete_cookie_cache
-from .db_util import get_private_cookie, delete_cookie
-from .db_util import get_public_cookie, limit_public_cookie
+from .db_util import credential_index, update_cookie_cache, delete_cookie_cache
+from .db_util import delete_cookie, limit_public_cookie
+from . import http_util
 from .message_util import send_cookie_delete_msg
 
 
@@ -32,53 +31,24 @@ class FreqLimiter2:
 
 # 获取可用的cookie
 async def get_use_cookie(user_id, uid='', mys_id='', action=''):
-    cache_cookie = await get_cookie_cache(uid, 'uid')
-    cookies = await get_private_cookie(user_id, 'user_id')
-    if not cookies:
-        if cache_cookie:
-            if cache_cookie['type'] == 'public':
-                logger.info(f'---派蒙调用{uid}的缓存公共cookie执行{action}操作---')
-            else:
-                logger.info(f'---派蒙调用{uid}的缓存私人cookie执行{action}操作---')
-            return cache_cookie
-        public_cookie = await get_public_cookie()
-        if not public_cookie:
-            logger.info(f'---派蒙当前没有可用的公共cookie，可能是都达到了上限或没有公共cookie---')
-            return None
-        else:
-            logger.info(f'---派蒙调用{public_cookie[0]}号公共cookie执行{action}操作---')
-            return {'type': 'public', 'cookie': public_cookie[1], 'no': public_cookie[0]}
+    source, cookie = credential_index.resolve(user_id, uid, mys_id)
+    if source == 'none':
+        logger.info(f'---派蒙当前没有可用的公共cookie，可能是都达到了上限或没有公共cookie---')
+    elif source == 'public':
+        logger.debug(f'---派蒙调用{cookie["no"]}号公共cookie执行{action}操作---')
+    elif source == 'cache':
+        logger.debug(f'---派蒙调用{uid}的缓存{"公共" if cookie["type"] == "public" else "私人"}cookie执行{action}操作---')
     else:
-        for user_id_, cookie, uid_, mys_id_ in cookies:
-            if (uid and uid_ == uid) or (mys_id and mys_id_ == mys_id):
-                logger.info(f'---派蒙调用用户{user_id_}的uid{uid_}私人cookie执行{action}操作---')
-                return {'type': 'private', 'user_id': user_id_, 'cookie': cookie, 'uid': uid_, 'mys_id': mys_id_}
-        if cache_cookie:
-            if cache_cookie['type'] == 'public':
-                logger.info(f'---派蒙调用{uid}的缓存公共cookie执行{action}操作---')
-            else:
-                logger.info(f'---派蒙调用{uid}的缓存私人cookie执行{action}操作---')
-            return cache_cookie
-        use_cookie = random.choice(cookies)
-        logger.info(f'---派蒙调用用户{use_cookie[0]}的uid{use_cookie[2]}私人cookie执行{action}操作---')
-        return {'type':   'private', 'user_id': use_cookie[0], 'cookie': use_cookie[1], 'uid': use_cookie[2],
-                'mys_id': use_cookie[3]}
+        logger.debug(f'---派蒙调用用户{cookie["user_id"]}的uid{cookie["uid"]}私人cookie执行{action}操作---')
+    return cookie
 
 
 # 获取可用的私人cookie
 async def get_own_cookie(uid='', mys_id='', action=''):
-    if uid:
-        cookie = (await get_private_cookie(uid, 'uid'))
-    elif mys_id:
-        cookie = (await get_private_cookie(mys_id, 'mys_id'))
-    else:
-        cookie = None
-    if not cookie:
-        return None
-    else:
-        cookie = cookie[0]
-        logger.info(f'---派蒙调用用户{cookie[0]}的uid{cookie[2]}私人cookie执行{action}操作---')
-        return {'type': 'private', 'user_id': cookie[0], 'cookie': cookie[1], 'uid': cookie[2], 'mys_id': cookie[3]}
+    cookie = credential_index.resolve_own(uid, mys_id)
+    if cookie:
+        logger.debug(f'---派蒙调用用户{cookie["user_id"]}的uid{cookie["uid"]}私人cookie执行{action}操作---')
+    return cookie
 
 
 # 检查数据返回状态，10001为ck过期了，10101为达到每日30次上线了
@@ -201,7 +171,7 @@ async def check_cookie(cookie):
         'x-rpc-client_type': '5',
         'Referer':           'https://webstatic.mihoyo.com/'
     }
-    res = await aiorequests.get(url=url, headers=headers)
+    res = await http_util.get(url=url, headers=headers)
     res = res.json()
     if res['retcode'] != 0:
         return False
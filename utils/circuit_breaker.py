@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Tuple
+
+from nonebot import logger
+
+from .config import config
+
+
+class CircuitOpenError(Exception):
+    """
+    上游接口熔断期间直接抛出的异常，信息可以直接回复给用户
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f'{upstream}接口暂时不可用，派蒙先不去请求了，{int(retry_after) + 1}秒后再试吧')
+
+
+class CircuitBreaker:
+    """
+    单个上游的熔断器，统计最近window秒内请求的失败率，超过slow_call秒的请求也算作失败
+    closed: 正常放行，失败率达到error_rate且请求数不少于min_calls时转为open
+    open: 直接拒绝请求，open_seconds秒后转为half_open
+    half_open: 只放行一个探测请求，成功则转为closed，失败则重新open
+    """
+
+    def __init__(self, name: str, error_rate: float = 0.5, open_seconds: float = 30, window: float = 60,
+                 min_calls: int = 10, slow_call: float = 10):
+        self.name = name
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.window = window
+        self.min_calls = min_calls
+        self.slow_call = slow_call
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.probing = False
+        # (结束时间, 是否成功)
+        self.calls: Deque[Tuple[float, bool]] = deque()
+
+    def _trim(self, now: float):
+        while self.calls and now - self.calls[0][0] > self.window:
+            self.calls.popleft()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - monotonic())
+
+    def before(self):
+        """
+        请求前调用，熔断中时抛出CircuitOpenError，否则放行；放行了half_open的探测请求后必须调用after或release
+        """
+        if self.state == 'open':
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.name, self.retry_after())
+            self.state = 'half_open'
+        if self.state == 'half_open':
+            if self.probing:
+                raise CircuitOpenError(self.name, 1)
+            self.probing = True
+
+    def after(self, ok: bool, latency: float):
+        now = monotonic()
+        ok = ok and latency < self.slow_call
+        if self.state == 'half_open':
+            self.probing = False
+            if ok:
+                logger.info(f'派蒙检测到{self.name}接口已恢复')
+                self.state = 'closed'
+                self.calls.clear()
+            else:
+                self._open(now)
+            return
+        self.calls.append((now, ok))
+        self._trim(now)
+        failed = sum(1 for _, call_ok in self.calls if not call_ok)
+        if self.state == 'closed' and len(self.calls) >= self.min_calls and failed / len(self.calls) >= self.error_rate:
+            self._open(now)
+
+    def release(self):
+        # 请求被取消而没有结果时，让出探测的名额
+        if self.state == 'half_open':
+            self.probing = False
+
+    def _open(self, now: float):
+        if self.state != 'open':
+            logger.warning(f'派蒙检测到{self.name}接口异常，暂停请求{self.open_seconds}秒')
+        self.state = 'open'
+        self.opened_at = now
+        self.calls.clear()
+
+    async def wait_ready(self):
+        """
+        等待熔断结束，供批量任务在接口恢复前暂停使用
+        """
+        while self.state != 'closed':
+            if self.state == 'open' and self.retry_after() > 0:
+                await asyncio.sleep(self.retry_after())
+            elif self.state == 'open' or not self.probing:
+                # 可以探测了，由调用方的请求来探测
+                return
+            else:
+                await asyncio.sleep(1)
+
+
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    breaker = breakers.get(upstream)
+    if breaker is None:
+        breaker = breakers[upstream] = CircuitBreaker(upstream, error_rate=config.paimon_breaker_error_rate,
+                                                      open_seconds=config.paimon_breaker_open_seconds)
+    return breaker
@@ -24,6 +24,61 @@ class PluginConfig(BaseModel):
     paimon_coin_hour: int = 0
     # 自动米游币获取开始时间（分钟）
     paimon_coin_minute: int = 5
+    # 每个公共cookie每日最多使用次数，米游社的上限为30，留出余量以免被接口拒绝
+    paimon_public_cookie_quota: int = 27
+    # 落盘的米游社接口响应缓存大小上限（MB）
+    paimon_response_cache_size: int = 64
+    # 每个接口的内存缓存最多保存的条目数
+    paimon_cache_max_size: int = 1024
+    # 每个接口的内存缓存估算占用上限（MB）
+    paimon_cache_max_memory: int = 32
+    # 每组上游站点(如米游社、enka)的HTTP连接池最大连接数
+    paimon_http_max_connections: int = 20
+    # 批量任务请求各组上游接口的限速，格式为[每分钟请求数, 可突发的请求数]，每分钟请求数填0或负数时不限速
+    # 米游社战绩接口(树脂提醒)
+    paimon_rate_record: List[float] = [6, 1]
+    # 米游社签到接口(自动签到)
+    paimon_rate_sign: List[float] = [6, 1]
+    # 米游社讨论区接口(米游币获取)
+    paimon_rate_bbs: List[float] = [20, 1]
+    # enka角色面板接口(角色信息更新)
+    paimon_rate_enka: List[float] = [6, 1]
+    # 抽卡记录接口
+    paimon_rate_gacha_log: List[float] = [120, 1]
+    # 上游接口最近一分钟的请求失败率达到多少时熔断
+    paimon_breaker_error_rate: float = 0.5
+    # 熔断后暂停请求该接口的时间（秒）
+    paimon_breaker_open_seconds: int = 30
+    # 把米游社(含抽卡记录)和enka接口的请求转发到本地替身服务器(tools/mock_upstream)的地址，其他站点照常请求，留空则直接请求上游
+    paimon_upstream_proxy: str = ''
+    # 一次查询多个uid时(如ysa uid1 uid2)，同时查询的uid数上限
+    paimon_query_concurrency: int = 4
+    # 绘图用的图标解码后在内存中缓存的大小上限（MB）
+    paimon_image_cache_size: int = 64
+    # 背景、边框等静态素材解码后在内存中缓存的大小上限（MB）
+    paimon_asset_cache_size: int = 128
+    # 是否在启动时预先载入常用的静态素材
+    paimon_asset_preload: bool = True
+    # 预先合成好静态图层的卡片模板底图在内存中缓存的大小上限（MB）
+    paimon_template_cache_size: int = 64
+    # 绘图进程数，大于0时卡片在多个进程中并行绘制(仅支持fork的系统，如Linux)，为0时在一个后台线程中绘制，为-1时按CPU核数自动设置(最多4个)
+    paimon_render_workers: int = 0
+    # 绘制好的卡片图片在内存中缓存的大小上限（MB），相同数据再次查询时直接发送缓存的图片，为0时不缓存
+    paimon_render_cache_size: int = 32
+    # 超出内存上限的卡片图片转存到磁盘的大小上限（MB），为0时不转存
+    paimon_render_cache_disk_size: int = 0
+    # 卡片图片的编码方案，default为普通的JPEG/PNG，chat为体积更小的渐进式JPEG和压缩过的PNG，webp为WebP(需要协议端和QQ客户端支持)
+    paimon_image_profile: str = 'chat'
+    # 卡片图片编码后的大小上限（KB），超过时降低图片质量直到不超过上限，为0时不限制
+    paimon_image_max_size: int = 0
+    # 是否把卡片图片写入文件后发送文件地址，而不是把图片base64后放进消息，需要协议端能读取到该文件
+    paimon_image_store: bool = False
+    # 图片文件的存放目录，可以设为内存盘(如/dev/shm/paimon)
+    paimon_image_store_path: str = 'data/LittlePaimon/image_store'
+    # 协议端与派蒙不在同一台机器时，提供上述目录的HTTP地址，留空则发送file:///路径
+    paimon_image_store_url: str = ''
+    # 图片文件的保留时间（秒），过期后自动删除
+    paimon_image_store_ttl: int = 600
     # 对联冷却（秒）
     paimon_couplets_cd: int = 6
     # 猫图冷却（秒）
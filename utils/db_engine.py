@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+
+class Database:
+    """
+    进程内共享的异步SQLite引擎
+    所有写操作由唯一的写线程串行执行，读操作分发给一个小的只读连接池，
+    连接均为长连接并开启WAL模式，语句通过参数化的方式交由sqlite缓存预编译
+    """
+
+    def __init__(self, path: Path, readers: int = 3, cached_statements: int = 256):
+        self.path = path
+        self.readers = readers
+        self.cached_statements = cached_statements
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._reader: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=self.cached_statements)
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        conn.execute('PRAGMA busy_timeout=5000;')
+        if readonly:
+            conn.execute('PRAGMA query_only=ON;')
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _conn(self, readonly: bool) -> sqlite3.Connection:
+        # 每个线程持有自己的长连接，写线程只有一个，所以写连接也只有一个
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect(readonly)
+        return conn
+
+    def _start(self):
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='paimon-db-writer')
+            self._reader = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix='paimon-db-reader')
+
+    async def _submit(self, readonly: bool, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        self._start()
+        executor = self._reader if readonly else self._writer
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, lambda: func(self._conn(readonly)))
+
+    async def fetchone(self, sql: str, params: Sequence = ()) -> Optional[Tuple]:
+        return await self._submit(True, lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence = ()) -> List[Tuple]:
+        return await self._submit(True, lambda conn: conn.execute(sql, params).fetchall())
+
+    async def execute(self, sql: str, params: Sequence = ()) -> int:
+        """
+        在写线程执行一条写语句并提交
+        :return: 受影响的行数
+        """
+
+        def _execute(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute(sql, params).rowcount
+
+        return await self._submit(False, _execute)
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Sequence]) -> int:
+        seq_of_params = list(seq_of_params)
+
+        def _executemany(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.executemany(sql, seq_of_params).rowcount
+
+        return await self._submit(False, _executemany)
+
+    async def transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        在写线程内以单个事务执行func(conn)，用于需要读后写或多条语句原子执行的场景
+        """
+
+        def _transaction(conn: sqlite3.Connection) -> Any:
+            with conn:
+                return func(conn)
+
+        return await self._submit(False, _transaction)
+
+    async def close(self):
+        if self._writer is None:
+            return
+        writer, reader = self._writer, self._reader
+        self._writer = self._reader = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, writer.shutdown)
+        await loop.run_in_executor(None, reader.shutdown)
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,165 @@
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table});')]
+
+
+def _v1_create_tables(conn: sqlite3.Connection):
+    """
+    建立全部数据表，并修正旧版本各处建表语句不一致留下的差异
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS public_cookies
+    (
+        no int IDENTITY(1,1) PRIMARY KEY,
+        cookie TEXT,
+        status TEXT
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS private_cookies
+    (
+        user_id TEXT NOT NULL,
+        uid TEXT NOT NULL,
+        mys_id TEXT,
+        cookie TEXT,
+        stoken TEXT,
+        PRIMARY KEY (user_id, uid)
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS cookie_cache
+    (
+        uid TEXT PRIMARY KEY NOT NULL,
+        mys_id TEXT,
+        cookie TEXT
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS last_query
+    (
+        user_id TEXT PRIMARY KEY NOT NULL,
+        uid TEXT,
+        mys_id TEXT,
+        last_time datetime
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS note_remind
+    (
+        user_id TEXT NOT NULL,
+        uid TEXT NOT NULL,
+        count INTEGER,
+        remind_group TEXT,
+        enable boolean,
+        last_remind_time datetime,
+        today_remind_count INTEGER,
+        PRIMARY KEY (user_id, uid)
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS bbs_sign
+    (
+        user_id TEXT NOT NULL,
+        uid TEXT NOT NULL,
+        group_id TEXT,
+        PRIMARY KEY (user_id, uid)
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS coin_bbs_sign
+    (
+        user_id TEXT NOT NULL,
+        uid TEXT NOT NULL,
+        group_id TEXT,
+        PRIMARY KEY (user_id, uid)
+    );''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS myb_exchange
+    (
+        user_id TEXT NOT NULL PRIMARY KEY,
+        uid TEXT,
+        cookie TEXT,
+        address_id INTEGER,
+        goods_id TEXT,
+        exchange_time datetime
+    );''')
+    # 旧版本中last_query有时不带mys_id列被建出来
+    if 'mys_id' not in _columns(conn, 'last_query'):
+        conn.execute('ALTER TABLE last_query ADD COLUMN mys_id TEXT;')
+    # 旧版本cookie_cache的建表语句漏了逗号，stoken被并进了cookie列的类型里，该列从未被使用过
+    if 'cookie' not in _columns(conn, 'cookie_cache'):
+        conn.execute('ALTER TABLE cookie_cache ADD COLUMN cookie TEXT;')
+
+
+def _v2_public_cookies_no(conn: sqlite3.Connection):
+    """
+    public_cookies的no列原先并不是自增主键，插入的行no都为NULL，重建该表使编号真正自增，并对cookie去重
+    """
+    conn.execute('''CREATE TABLE public_cookies_new
+    (
+        no INTEGER PRIMARY KEY AUTOINCREMENT,
+        cookie TEXT UNIQUE,
+        status TEXT
+    );''')
+    conn.execute('''INSERT OR IGNORE INTO public_cookies_new (cookie, status)
+        SELECT cookie, status FROM public_cookies WHERE cookie IS NOT NULL ORDER BY rowid;''')
+    conn.execute('DROP TABLE public_cookies;')
+    conn.execute('ALTER TABLE public_cookies_new RENAME TO public_cookies;')
+
+
+def _v3_credential_indexes(conn: sqlite3.Connection):
+    """
+    为获取cookie时按uid、mys_id、cookie查找的语句建立索引，避免随绑定账号数增长的全表扫描
+    """
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_private_cookies_uid ON private_cookies (uid);')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_private_cookies_mys_id ON private_cookies (mys_id);')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_private_cookies_cookie ON private_cookies (cookie);')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_public_cookies_cookie_status ON public_cookies (cookie, status);')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_cookie_cache_cookie ON cookie_cache (cookie);')
+
+
+def _v4_public_cookie_usage(conn: sqlite3.Connection):
+    """
+    记录公共cookie当日的使用次数及其所属日期，供公共cookie池重启后恢复
+    """
+    conn.execute('ALTER TABLE public_cookies ADD COLUMN today_count INTEGER NOT NULL DEFAULT 0;')
+    conn.execute('ALTER TABLE public_cookies ADD COLUMN count_date TEXT;')
+
+
+def _to_timestamp(value, fmt: str):
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(datetime.strptime(value, fmt).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def _v5_integer_timestamps(conn: sqlite3.Connection):
+    """
+    将树脂提醒和最后查询的时间由字符串改存为整数时间戳，并建立索引，
+    使定时任务能在SQL中直接筛出到期的行，而不是取出全表后逐行解析时间
+    """
+    rows = conn.execute('SELECT rowid, last_remind_time FROM note_remind;').fetchall()
+    conn.executemany('UPDATE note_remind SET last_remind_time=? WHERE rowid=?;',
+                     [(_to_timestamp(t, '%Y%m%d %H:%M:%S') or 0, rowid) for rowid, t in rows])
+    rows = conn.execute('SELECT rowid, last_time FROM last_query;').fetchall()
+    conn.executemany('UPDATE last_query SET last_time=? WHERE rowid=?;',
+                     [(_to_timestamp(t, '%Y-%m-%d %H:%M:%S'), rowid) for rowid, t in rows])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_note_remind_due ON note_remind (enable, last_remind_time);')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_last_query_last_time ON last_query (last_time);')
+
+
+# 按顺序排列的迁移，第n个迁移执行后数据库的user_version即为n，只能在末尾追加
+migrations: List[Callable[[sqlite3.Connection], None]] = [
+    _v1_create_tables,
+    _v2_public_cookies_no,
+    _v3_credential_indexes,
+    _v4_public_cookie_usage,
+    _v5_integer_timestamps,
+]
+SCHEMA_VERSION = len(migrations)
+
+
+def upgrade(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """
+    将数据库升级到最新的结构版本，全部迁移在同一个事务中执行
+    :param conn: 写连接
+    :return: (升级前版本, 升级后版本)
+    """
+    conn.execute('BEGIN IMMEDIATE;')
+    version = conn.execute('PRAGMA user_version;').fetchone()[0]
+    for new_version, migration in enumerate(migrations[version:], start=version + 1):
+        migration(conn)
+        conn.execute(f'PRAGMA user_version={new_version};')
+    return version, max(version, SCHEMA_VERSION)
@@ -1,545 +1,564 @@
-import sqlite3
-from datetime import datetime
+import asyncio
+import random
+from collections import Counter, OrderedDict, defaultdict
+from datetime import date
 from pathlib import Path
+from time import time
+from typing import Dict, List, Optional, Tuple
+
+from nonebot import get_driver, logger
+
+from .config import config
+from .db_engine import Database
+from .db_schema import upgrade
 
 db_path = Path() / 'data' / 'LittlePaimon' / 'user_data' / 'user_data.db'
+db = Database(db_path)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    old_version, new_version = await db.transaction(upgrade)
+    if old_version != new_version:
+        logger.info(f'派蒙用户数据库结构已从版本{old_version}升级到{new_version}')
+    await last_query_cache.load()
+    await public_cookie_pool.load()
+    await credential_index.load()
+
+
+@driver.on_shutdown
+async def _():
+    await last_query_cache.close()
+    await public_cookie_pool.close()
+    await db.close()
+
+
+class PublicCookiePool:
+    """
+    公共cookie池，在内存中记录每个cookie当天已查询的次数，每次取用次数最少的可用cookie，
+    达到quota时提前标记为上限，避免用到第30次被接口拒绝后才切换；次数定期写回数据库，每日0点清空
+    """
+
+    def __init__(self, quota: int = 27, persist_interval: float = 60):
+        self.quota = quota
+        self.persist_interval = persist_interval
+        # cookie -> {'no': 编号, 'status': 状态, 'count': 今日次数}
+        self.cookies: Dict[str, dict] = {}
+        self.day = date.today().isoformat()
+        self.dirty = set()
+        self._persist_task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        rows = await db.fetchall('SELECT no, cookie, status, today_count, count_date FROM public_cookies;')
+        for no, cookie, status, count, count_date in rows:
+            if count_date != self.day:
+                count = 0
+                status = 'OK' if status == 'limited30' else status
+            self.cookies[cookie] = {'no': no, 'status': status, 'count': count}
+        self._persist_task = asyncio.create_task(self._persist_loop())
+
+    def _check_day(self):
+        # 跨天但每日清空任务没有执行(例如0点时派蒙不在线)时，在内存中补做清空
+        today = date.today().isoformat()
+        if today != self.day:
+            self.day = today
+            self._reset()
+
+    def _reset(self):
+        for cookie, info in self.cookies.items():
+            info['count'] = 0
+            if info['status'] == 'limited30':
+                info['status'] = 'OK'
+            self.dirty.add(cookie)
+
+    def acquire(self) -> Optional[Tuple[int, str]]:
+        """
+        取出今日使用次数最少的可用公共cookie，并计一次使用
+        :return: (编号, cookie)，没有可用的cookie时返回None
+        """
+        self._check_day()
+        available = [(info['count'], info['no'], cookie) for cookie, info in self.cookies.items()
+                     if info['status'] == 'OK']
+        if not available:
+            return None
+        count, no, cookie = min(available)
+        info = self.cookies[cookie]
+        info['count'] = count + 1
+        if info['count'] >= self.quota:
+            logger.info(f'{no}号公共cookie今日已使用{info["count"]}次，达到设定的上限，暂停使用')
+            info['status'] = 'limited30'
+        self.dirty.add(cookie)
+        return no, cookie
+
+    def add(self, no: int, cookie: str):
+        self.cookies.setdefault(cookie, {'no': no, 'status': 'OK', 'count': 0})
+
+    def limit(self, cookie: str):
+        if cookie in self.cookies:
+            self.cookies[cookie]['status'] = 'limited30'
+            self.dirty.add(cookie)
+
+    def remove(self, cookie: str):
+        self.cookies.pop(cookie, None)
+        self.dirty.discard(cookie)
+
+    async def reset(self):
+        self.day = date.today().isoformat()
+        self._reset()
+        await self.persist()
+
+    async def persist(self):
+        if not self.dirty:
+            return
+        dirty, self.dirty = self.dirty, set()
+        params = [(self.cookies[cookie]['status'], self.cookies[cookie]['count'], self.day, cookie)
+                  for cookie in dirty if cookie in self.cookies]
+        try:
+            await db.executemany('UPDATE public_cookies SET status=?, today_count=?, count_date=? WHERE cookie=?;',
+                                 params)
+        except Exception:
+            self.dirty |= dirty
+            raise
+
+    async def _persist_loop(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception as e:
+                logger.error(f'派蒙写入公共cookie使用次数失败: {e}')
+
+    async def close(self):
+        if self._persist_task:
+            self._persist_task.cancel()
+            self._persist_task = None
+        await self.persist()
+
+
+public_cookie_pool = PublicCookiePool(quota=config.paimon_public_cookie_quota)
 
 
 # 获取公共cookie
 async def get_public_cookie():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS public_cookies(
-        no int IDENTITY(1,1) PRIMARY KEY,
-        cookie TEXT,
-        status TEXT);''')
-    cursor.execute('SELECT no, cookie FROM public_cookies WHERE status="OK";')
-    cookie = cursor.fetchone()
-    conn.commit()
-    conn.close()
-    return cookie
+    return public_cookie_pool.acquire()
 
 
 # 插入公共cookie
 async def insert_public_cookie(cookie):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS public_cookies 
-    (
-        no int IDENTITY(1,1) PRIMARY KEY,
-        cookie TEXT,
-        status TEXT
-    );''')
-    cursor.execute('INSERT OR IGNORE INTO public_cookies (cookie, status) VALUES (?,"OK");', (cookie,))
-    conn.commit()
-    conn.close()
+    await db.execute("INSERT OR IGNORE INTO public_cookies (cookie, status) VALUES (?, 'OK');", (cookie,))
+    res = await db.fetchone('SELECT no FROM public_cookies WHERE cookie=?;', (cookie,))
+    public_cookie_pool.add(res[0], cookie)
 
 
 # 设置公共cookie到上限
 async def limit_public_cookie(cookie):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS public_cookies(
-        no int IDENTITY(1,1) PRIMARY KEY,
-        cookie TEXT,
-        status TEXT);''')
-    cursor.execute('UPDATE public_cookies SET status="limited30" WHERE cookie=?;', (cookie,))
-    conn.commit()
-    conn.close()
+    public_cookie_pool.limit(cookie)
+    await public_cookie_pool.persist()
 
 
 # 清除公共cookie上限
 async def reset_public_cookie():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS public_cookies(
-        no int IDENTITY(1,1) PRIMARY KEY,
-        cookie TEXT,
-        status TEXT);''')
-    cursor.execute('UPDATE public_cookies SET status="OK" WHERE status="limited30";')
-    conn.commit()
-    conn.close()
+    await public_cookie_pool.reset()
+
+
+class CredentialIndex:
+    """
+    私人cookie与cookie缓存的内存索引，启动时从数据库载入，之后随每次写入同步更新，
+    按user_id、uid、mys_id、cookie查找cookie时直接查表，不再访问数据库
+    """
+
+    # 记录为(user_id, cookie, uid, mys_id, stoken)，与private_cookies表的列对应
+    fields = {'user_id': 0, 'cookie': 1, 'uid': 2, 'mys_id': 3}
+
+    def __init__(self):
+        # (user_id, uid) -> 记录
+        self.private: Dict[Tuple[str, str], tuple] = {}
+        # 字段名 -> 字段值 -> {(user_id, uid): 记录}
+        self.indexes: Dict[str, Dict[str, Dict[Tuple[str, str], tuple]]] = {key: defaultdict(dict)
+                                                                           for key in self.fields}
+        # uid -> 该uid上一次查询成功所用的cookie，对应cookie_cache表
+        self.cache: Dict[str, str] = {}
+        self.counter = Counter()
+
+    async def load(self):
+        for row in await db.fetchall('SELECT user_id, cookie, uid, mys_id, stoken FROM private_cookies;'):
+            self._add(row)
+        rows = await db.fetchall('SELECT uid, cookie FROM cookie_cache WHERE cookie IS NOT NULL;')
+        self.cache = dict(rows)
+
+    def _add(self, record: tuple):
+        pk = (record[0], record[2])
+        self._discard(pk)
+        self.private[pk] = record
+        for key, i in self.fields.items():
+            self.indexes[key][record[i]][pk] = record
+
+    def _discard(self, pk: Tuple[str, str]):
+        record = self.private.pop(pk, None)
+        if record is None:
+            return
+        for key, i in self.fields.items():
+            index = self.indexes[key]
+            index[record[i]].pop(pk, None)
+            if not index[record[i]]:
+                del index[record[i]]
+
+    def find(self, value, key: str = 'user_id') -> List[tuple]:
+        records = self.indexes[key].get(str(value))
+        return list(records.values()) if records else []
+
+    def set_private(self, user_id, uid, mys_id, cookie, stoken):
+        self._add(tuple(None if v is None else str(v) for v in (user_id, cookie, uid, mys_id, stoken)))
+
+    def remove_private(self, value, key: str = 'user_id'):
+        for record in self.find(value, key):
+            self._discard((record[0], record[2]))
+
+    def set_cache(self, uid, cookie: str):
+        self.cache[str(uid)] = cookie
+
+    def drop_cache(self, value='', key: str = 'cookie'):
+        if key == 'uid':
+            self.cache.pop(str(value), None)
+        else:
+            for uid in [uid for uid, cookie in self.cache.items() if cookie == value]:
+                del self.cache[uid]
+
+    def cached(self, uid) -> Optional[dict]:
+        """
+        取uid的缓存cookie，并查明它属于哪个私人账号或是第几号公共cookie
+        """
+        cookie = self.cache.get(str(uid))
+        if not cookie:
+            return None
+        owner = self.find(cookie, 'cookie')
+        if owner:
+            return _private_dict(owner[0])
+        if cookie in public_cookie_pool.cookies:
+            return {'type': 'public', 'cookie': cookie, 'no': public_cookie_pool.cookies[cookie]['no']}
+        return None
+
+    def resolve(self, user_id, uid='', mys_id='') -> Tuple[str, Optional[dict]]:
+        """
+        为user_id查询uid或mys_id选择要使用的cookie，优先级为：
+        本人绑定的该账号 > 该uid的缓存cookie > 本人绑定的其他账号(随机) > 公共cookie
+        :return: (来源, cookie信息)，来源为private、cache、random、public或none
+        """
+        cookies = self.find(user_id, 'user_id')
+        for record in cookies:
+            if (uid and record[2] == str(uid)) or (mys_id and record[3] == str(mys_id)):
+                return self._count('private', _private_dict(record))
+        cache_cookie = self.cached(uid)
+        if cache_cookie:
+            return self._count('cache', cache_cookie)
+        if cookies:
+            return self._count('random', _private_dict(random.choice(cookies)))
+        public_cookie = public_cookie_pool.acquire()
+        if public_cookie:
+            return self._count('public', {'type': 'public', 'cookie': public_cookie[1], 'no': public_cookie[0]})
+        return self._count('none', None)
+
+    def resolve_own(self, uid='', mys_id='') -> Optional[dict]:
+        if uid:
+            cookies = self.find(uid, 'uid')
+        elif mys_id:
+            cookies = self.find(mys_id, 'mys_id')
+        else:
+            cookies = []
+        if not cookies:
+            return self._count('own_none', None)[1]
+        return self._count('own', _private_dict(cookies[0]))[1]
+
+    def _count(self, source: str, cookie: Optional[dict]) -> Tuple[str, Optional[dict]]:
+        self.counter[source] += 1
+        return source, cookie
+
+    def stats(self) -> dict:
+        """
+        统计启动以来获取cookie的情况
+        hit为直接命中本人绑定账号或uid缓存的次数，miss为需要退而使用其他账号或公共cookie的次数
+        """
+        counter = self.counter
+        return {
+            'hit':             counter['private'] + counter['cache'] + counter['own'],
+            'miss':            counter['random'] + counter['public'] + counter['none'] + counter['own_none'],
+            'public_fallback': counter['public'],
+            'no_cookie':       counter['none'] + counter['own_none'],
+            'sources':         dict(counter),
+            'private_cookies': len(self.private),
+            'cache_size':      len(self.cache),
+        }
+
+
+def _private_dict(record: tuple) -> dict:
+    return {'type': 'private', 'user_id': record[0], 'cookie': record[1], 'uid': record[2], 'mys_id': record[3]}
+
+
+credential_index = CredentialIndex()
 
 
 # 通过key(如user_id, uid)获取私人cookie
 async def get_private_cookie(value, key='user_id'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS private_cookies
-        (
-            user_id TEXT NOT NULL,
-            uid TEXT NOT NULL,
-            mys_id TEXT,
-            cookie TEXT,
-            stoken TEXT,
-            PRIMARY KEY (user_id, uid)
-        );''')
-    cursor.execute(f'SELECT user_id, cookie, uid, mys_id FROM private_cookies WHERE {key}="{value}";')
-    cookie = cursor.fetchall()
-    conn.close()
-    return cookie
+    return [record[:4] for record in credential_index.find(value, key)]
 
 
 # 通过key(如user_id, uid)获取私人Stoken
 async def get_private_stoken(value, key='user_id'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS private_cookies
-        (
-            user_id TEXT NOT NULL,
-            uid TEXT NOT NULL,
-            mys_id TEXT,
-            cookie TEXT,
-            stoken TEXT,
-            PRIMARY KEY (user_id, uid)
-        );''')
-    cursor.execute(f'SELECT user_id, cookie, uid, mys_id,stoken FROM private_cookies WHERE {key}="{value}";')
-    stoken = cursor.fetchall()
-    conn.close()
-    return stoken
+    return credential_index.find(value, key)
 
 
 # 更新cookie
 async def update_private_cookie(user_id, uid='', mys_id='', cookie='', stoken=''):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS private_cookies
-        (
-            user_id TEXT NOT NULL,
-            uid TEXT NOT NULL,
-            mys_id TEXT,
-            cookie TEXT,
-            stoken TEXT,
-            PRIMARY KEY (user_id, uid)
-        );''')
-    cursor.execute('REPLACE INTO private_cookies VALUES (?, ?, ?, ?, ?);', (user_id, uid, mys_id, cookie, stoken))
-    conn.commit()
-    conn.close()
+    await db.execute('REPLACE INTO private_cookies VALUES (?, ?, ?, ?, ?);', (user_id, uid, mys_id, cookie, stoken))
+    credential_index.set_private(user_id, uid, mys_id, cookie, stoken)
 
 
 # 更新stoken
 async def update_private_stoken(user_id, uid='', mys_id='', cookie='', stoken=''):
     # 保证cookie不被更新
-    ck = await get_private_cookie(uid, key='uid')
+    ck = credential_index.find(uid, key='uid')
     cookie = ck[0][1]
-
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS private_cookies
-        (
-            user_id TEXT NOT NULL,
-            uid TEXT NOT NULL,
-            mys_id TEXT,
-            cookie TEXT,
-            stoken TEXT,
-            PRIMARY KEY (user_id, uid)
-        );''')
-    cursor.execute('REPLACE INTO private_cookies VALUES (?, ?, ?, ?, ?);', (user_id, uid, mys_id, cookie, stoken))
-    conn.commit()
-    conn.close()
+    await db.execute('REPLACE INTO private_cookies VALUES (?, ?, ?, ?, ?);', (user_id, uid, mys_id, cookie, stoken))
+    credential_index.set_private(user_id, uid, mys_id, cookie, stoken)
 
 
 # 删除私人cookie
 async def delete_private_cookie(user_id):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS private_cookies
-        (
-            user_id TEXT NOT NULL,
-            uid TEXT NOT NULL,
-            mys_id TEXT,
-            cookie TEXT,
-            stoken TEXT,
-            PRIMARY KEY (user_id, uid)
-        );''')
-    cursor.execute('DELETE FROM private_cookies WHERE user_id=?', (user_id,))
-    conn.commit()
-    conn.close()
+    await db.execute('DELETE FROM private_cookies WHERE user_id=?', (user_id,))
+    credential_index.remove_private(user_id, 'user_id')
 
 
 # 删除cookie
 async def delete_cookie(cookie, type='public'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM cookie_cache WHERE cookie=?;', (cookie,))
-    cursor.execute(f'DELETE FROM {type}_cookies WHERE cookie="{cookie}";')
-    conn.commit()
-    conn.close()
+
+    def _delete(conn):
+        conn.execute('DELETE FROM cookie_cache WHERE cookie=?;', (cookie,))
+        conn.execute(f'DELETE FROM {type}_cookies WHERE cookie=?;', (cookie,))
+
+    await db.transaction(_delete)
+    credential_index.drop_cache(cookie, 'cookie')
+    if type == 'public':
+        public_cookie_pool.remove(cookie)
+    else:
+        credential_index.remove_private(cookie, 'cookie')
 
 
 # 获取cookie缓存
 async def get_cookie_cache(value, key='uid'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS cookie_cache(
-        uid TEXT PRIMARY KEY NOT NULL,
-        mys_id TEXT,
-        cookie TEXT
-        stoken TEXT);''')
-    cursor.execute(f'SELECT cookie FROM cookie_cache WHERE {key}="{value}"')
-    res = cursor.fetchone()
-    if res:
-        try:
-            cursor.execute('SELECT user_id, uid, mys_id FROM private_cookies WHERE cookie=?;', (res[0],))
-            is_in_private = cursor.fetchone()
-            if is_in_private:
-                return {'type':   'private', 'user_id': is_in_private[0], 'cookie': res[0], 'uid': is_in_private[1],
-                        'mys_id': is_in_private[2]}
-        except:
-            pass
-        try:
-            cursor.execute('SELECT no FROM public_cookies WHERE cookie=?;', (res[0],))
-            is_in_public = cursor.fetchone()
-            if is_in_public:
-                return {'type': 'public', 'cookie': res[0], 'no': is_in_public[0]}
-        except:
-            pass
-    conn.close()
-    return None
+    return credential_index.cached(value) if key == 'uid' else None
 
 
 # 更新cookie缓存
 async def update_cookie_cache(cookie, value, key='uid'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS cookie_cache(
-        uid TEXT PRIMARY KEY NOT NULL,
-        mys_id TEXT,
-        cookie TEXT);''')
-    cursor.execute(f'REPLACE INTO cookie_cache ({key}, cookie) VALUES ("{value}", "{cookie}");')
-    conn.commit()
-    conn.close()
+    await db.execute(f'REPLACE INTO cookie_cache ({key}, cookie) VALUES (?, ?);', (value, cookie))
+    if key == 'uid':
+        credential_index.set_cache(value, cookie)
 
 
 # 删除cookie缓存
 async def delete_cookie_cache(value='', key='cookie', all=False):
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        if all:
-            cursor.execute('DROP TABLE cookie_cache;')
-        else:
-            cursor.execute(f'DELETE FROM cookie_cache WHERE {key}="{value}";')
-        conn.commit()
-        conn.close()
-    except:
-        pass
+    if all:
+        await db.execute('DELETE FROM cookie_cache;')
+        credential_index.cache.clear()
+    else:
+        await db.execute(f'DELETE FROM cookie_cache WHERE {key}=?;', (value,))
+        credential_index.drop_cache(value, key)
+
+
+class LastQueryCache:
+    """
+    user_id到最后查询uid的有界内存映射，启动时从last_query表载入，写入时先更新内存，
+    再由后台任务每隔flush_interval秒把合并后的写入批量提交到数据库
+    """
+
+    def __init__(self, max_size: int = 20000, flush_interval: float = 5):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.data: OrderedDict = OrderedDict()
+        # 内存中是否包含了表中的全部行，为True时未命中即可确定没有记录
+        self.complete = False
+        self.pending = {}
+        # 正在提交到数据库的一批写入，提交完成前同样比表中的记录新
+        self.flushing = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _set(self, user_id, uid):
+        self.data[user_id] = uid
+        self.data.move_to_end(user_id)
+        if len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+            self.complete = False
+
+    async def load(self):
+        rows = await db.fetchall('SELECT user_id, uid FROM last_query ORDER BY last_time DESC LIMIT ?;',
+                                 (self.max_size + 1,))
+        self.complete = len(rows) <= self.max_size
+        for user_id, uid in reversed(rows[:self.max_size]):
+            self.data[user_id] = uid
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def get(self, user_id):
+        if user_id in self.data:
+            self.data.move_to_end(user_id)
+            return self.data[user_id]
+        # 已被淘汰出内存但还没写入数据库的记录，表中的是旧值，以待写入的为准
+        record = self.pending.get(user_id) or self.flushing.get(user_id)
+        if record is not None:
+            uid = record[1] if record[0] == 'uid' else None
+            self._set(user_id, uid)
+            return uid
+        if self.complete:
+            return None
+        res = await db.fetchone('SELECT uid FROM last_query WHERE user_id=?;', (user_id,))
+        # 读库期间可能已有新的写入，以内存中的为准
+        if user_id in self.data:
+            return self.data[user_id]
+        uid = res[0] if res else None
+        self._set(user_id, uid)
+        return uid
+
+    def update(self, user_id, value, key='uid'):
+        # REPLACE会清空同一行的其他列，按key更新mys_id时uid也随之置空
+        self._set(user_id, value if key == 'uid' else None)
+        self.pending[user_id] = (key, value, int(time()))
+
+    async def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        self.flushing = pending
+        rows = defaultdict(list)
+        for user_id, (key, value, t) in pending.items():
+            rows[key].append((user_id, value, t))
+        try:
+            for key, params in rows.items():
+                await db.executemany(f'REPLACE INTO last_query (user_id, {key}, last_time) VALUES (?, ?, ?);', params)
+        except Exception:
+            # 写入失败时放回待写入队列，不覆盖期间产生的更新的记录
+            for user_id, record in pending.items():
+                self.pending.setdefault(user_id, record)
+            raise
+        finally:
+            self.flushing = {}
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f'派蒙写入最后查询uid记录失败: {e}')
+
+    async def close(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+
+last_query_cache = LastQueryCache()
 
 
 # 获取user_id最后查询的uid
 async def get_last_query(user_id):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS last_query(
-        user_id TEXT PRIMARY KEY NOT NULL,
-        uid TEXT,
-        last_time datetime);''')
-    cursor.execute('SELECT uid FROM last_query WHERE user_id=?;', (user_id,))
-    uid = cursor.fetchone()
-    conn.close()
-    return uid[0] if uid else None
+    return await last_query_cache.get(user_id)
 
 
 # 更新user_id最后查询的uid
 async def update_last_query(user_id, value, key='uid'):
-    t = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS last_query(
-        user_id TEXT PRIMARY KEY NOT NULL,
-        uid TEXT,
-        mys_id TEXT,
-        last_time datetime);''')
-    cursor.execute(f'REPLACE INTO last_query (user_id, {key}, last_time) VALUES ("{user_id}", "{value}", "{t}");')
-    conn.commit()
-    conn.close()
-
-
-async def get_all_query():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS last_query(
-            user_id TEXT PRIMARY KEY NOT NULL,
-            uid TEXT,
-            mys_id TEXT,
-            last_time datetime);''')
-    cursor.execute('SELECT uid, last_time FROM last_query')
-    uid_list = cursor.fetchall()
-    uids = []
-    for uid, last_time in uid_list:
-        if (datetime.now() - datetime.strptime(last_time, '%Y-%m-%d %H:%M:%S')).days <= 3:
-            uids.append(uid)
-    conn.close()
-    return uids
+    last_query_cache.update(user_id, value, key)
+
+
+# 获取近days天内查询过的uid
+async def get_all_query(days=3):
+    await last_query_cache.flush()
+    since = int(time()) - (days + 1) * 86400
+    uid_list = await db.fetchall('SELECT uid FROM last_query WHERE last_time>? AND uid IS NOT NULL;', (since,))
+    return [uid for uid, in uid_list]
 
 
 # 获取树脂提醒信息
 async def get_note_remind():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS note_remind
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        count INTEGER,
-        remind_group TEXT,
-        enable boolean,
-        last_remind_time datetime,
-        today_remind_count INTEGER,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('SELECT * FROM note_remind;')
-    res = cursor.fetchall()
-    conn.close()
-    return res
-
-
-# 更新树脂提醒信息
+    return await db.fetchall('SELECT * FROM note_remind;')
+
+
+# 获取需要检查树脂的提醒信息：已开启、距上次提醒超过cooldown秒、今日提醒次数未达到limit
+async def get_due_note_remind(cooldown, limit):
+    return await db.fetchall('SELECT * FROM note_remind WHERE enable=1 AND last_remind_time<? '
+                             'AND (IFNULL(today_remind_count, 0)=0 OR today_remind_count<?);',
+                             (int(time()) - cooldown, limit))
+
+
+# 更新树脂提醒信息，last_remind_time为整数时间戳
 async def update_note_remind(user_id, uid, count, remind_group, enable, last_remind_time, today_remind_count):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS note_remind
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        count INTEGER,
-        remind_group TEXT,
-        enable boolean,
-        last_remind_time datetime,
-        today_remind_count INTEGER,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('REPLACE INTO note_remind VALUES (?, ?, ?, ?, ?, ?, ?);',
-                   (user_id, uid, count, remind_group, enable, last_remind_time, today_remind_count))
-    conn.commit()
-    conn.close()
+    await db.execute('REPLACE INTO note_remind VALUES (?, ?, ?, ?, ?, ?, ?);',
+                     (user_id, uid, count, remind_group, enable, last_remind_time, today_remind_count))
 
 
 async def update_note_remind2(user_id, uid, remind_group, enable=True, count=''):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS note_remind
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        count INTEGER,
-        remind_group TEXT,
-        enable boolean,
-        last_remind_time datetime,
-        today_remind_count INTEGER,
-        PRIMARY KEY (user_id, uid)
-    );''')
     if count:
-        cursor.execute(
-            f'REPLACE INTO note_remind (user_id, uid, remind_group, count, enable) VALUES ("{user_id}", "{uid}", "{remind_group}", {count}, {enable});')
+        await db.execute('REPLACE INTO note_remind (user_id, uid, remind_group, count, enable, last_remind_time) '
+                         'VALUES (?, ?, ?, ?, ?, 0);', (user_id, uid, remind_group, int(count), enable))
     else:
-        cursor.execute(
-            f'UPDATE note_remind SET enable={enable}, remind_group={remind_group} WHERE user_id="{user_id}" AND uid="{uid}"')
-    conn.commit()
-    conn.close()
+        await db.execute('UPDATE note_remind SET enable=?, remind_group=? WHERE user_id=? AND uid=?',
+                         (enable, remind_group, user_id, uid))
 
 
 async def update_day_remind_count():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS note_remind
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        count INTEGER,
-        remind_group TEXT,
-        enable boolean,
-        last_remind_time datetime,
-        today_remind_count INTEGER,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('UPDATE note_remind SET today_remind_count=0 WHERE today_remind_count!=0')
-    conn.commit()
-    conn.close()
+    await db.execute('UPDATE note_remind SET today_remind_count=0 WHERE today_remind_count!=0')
 
 
 # 删除树脂提醒信息
 async def delete_note_remind(user_id, uid):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS note_remind
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        count INTEGER,
-        remind_group TEXT,
-        enable boolean,
-        last_remind_time datetime,
-        today_remind_count INTEGER,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('DELETE FROM note_remind WHERE user_id=? AND uid=?;', (user_id, uid))
-    conn.commit()
-    conn.close()
+    await db.execute('DELETE FROM note_remind WHERE user_id=? AND uid=?;', (user_id, uid))
 
 
 async def get_auto_sign():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('SELECT * FROM bbs_sign;')
-    res = cursor.fetchall()
-    conn.close()
-    return res
+    return await db.fetchall('SELECT * FROM bbs_sign;')
 
 
 async def add_auto_sign(user_id, uid, group_id):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('REPLACE INTO bbs_sign VALUES (?, ?, ?);', (user_id, uid, group_id))
-    conn.commit()
-    conn.close()
+    await db.execute('REPLACE INTO bbs_sign VALUES (?, ?, ?);', (user_id, uid, group_id))
 
 
 async def delete_auto_sign(user_id, uid):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('DELETE FROM bbs_sign WHERE user_id=? AND uid=?;', (user_id, uid))
-    conn.commit()
-    conn.close()
+    await db.execute('DELETE FROM bbs_sign WHERE user_id=? AND uid=?;', (user_id, uid))
 
 
 async def get_coin_auto_sign():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS coin_bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('SELECT user_id,uid,group_id FROM coin_bbs_sign;')
-    res = cursor.fetchall()
-    conn.close()
-    return res
+    return await db.fetchall('SELECT user_id,uid,group_id FROM coin_bbs_sign;')
 
 
 async def add_coin_auto_sign(user_id, uid, group_id):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS coin_bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('REPLACE INTO coin_bbs_sign VALUES (?, ?, ?);', (user_id, uid, group_id))
-    conn.commit()
-    conn.close()
+    await db.execute('REPLACE INTO coin_bbs_sign VALUES (?, ?, ?);', (user_id, uid, group_id))
 
 
 async def delete_coin_auto_sign(user_id, uid):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS coin_bbs_sign
-    (
-        user_id TEXT NOT NULL,
-        uid TEXT NOT NULL,
-        group_id TEXT,
-        PRIMARY KEY (user_id, uid)
-    );''')
-    cursor.execute('DELETE FROM coin_bbs_sign WHERE user_id=? AND uid=?;', (user_id, uid))
-    conn.commit()
-    conn.close()
+    await db.execute('DELETE FROM coin_bbs_sign WHERE user_id=? AND uid=?;', (user_id, uid))
 
 
 async def get_all_myb_exchange():
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS myb_exchange
-    (
-        user_id TEXT NOT NULL PRIMARY KEY,
-        uid TEXT,
-        cookie TEXT,
-        address_id INTEGER,
-        goods_id TEXT,
-        exchange_time datetime
-    );''')
-    cursor.execute('SELECT * FROM myb_exchange;')
-    res = cursor.fetchall()
-    conn.close()
-    return res
+    return await db.fetchall('SELECT * FROM myb_exchange;')
 
 
 async def get_myb_exchange(user_id, key):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS myb_exchange
-    (
-        user_id TEXT NOT NULL PRIMARY KEY,
-        uid TEXT,
-        cookie TEXT,
-        address_id INTEGER,
-        goods_id TEXT,
-        exchange_time datetime
-    );''')
-    cursor.execute(f'SELECT {key} FROM myb_exchange WHERE user_id = "{user_id}";')
-    res = cursor.fetchone()
-    conn.close()
+    res = await db.fetchone(f'SELECT {key} FROM myb_exchange WHERE user_id = ?;', (user_id,))
     return res[0] or None
 
 
 async def add_myb_exchange(user_id, value, key):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS myb_exchange
-    (
-        user_id TEXT NOT NULL PRIMARY KEY,
-        uid TEXT,
-        cookie TEXT,
-        address_id INTEGER,
-        goods_id TEXT,
-        exchange_time datetime
-    );''')
-    cursor.execute('SELECT * FROM myb_exchange WHERE user_id=?;', (user_id,))
-    res = cursor.fetchone()
-    if res:
-        cursor.execute(f'UPDATE myb_exchange SET {key}="{value}" WHERE user_id="{user_id}";')
-    else:
-        cursor.execute(f'INSERT INTO myb_exchange (user_id, {key}) VALUES ("{user_id}", "{value}");')
-    conn.commit()
-    conn.close()
+
+    def _add(conn):
+        res = conn.execute('SELECT * FROM myb_exchange WHERE user_id=?;', (user_id,)).fetchone()
+        if res:
+            conn.execute(f'UPDATE myb_exchange SET {key}=? WHERE user_id=?;', (value, user_id))
+        else:
+            conn.execute(f'INSERT INTO myb_exchange (user_id, {key}) VALUES (?, ?);', (user_id, value))
+
+    await db.transaction(_add)
 
 
 async def delete_myb_exchange(user_id):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS myb_exchange
-    (
-        user_id TEXT NOT NULL PRIMARY KEY,
-        uid TEXT,
-        cookie TEXT,
-        address_id INTEGER,
-        goods_id TEXT,
-        exchange_time datetime
-    );''')
-    cursor.execute('DELETE FROM myb_exchange WHERE user_id=?;', (user_id,))
-    conn.commit()
-    conn.close()
+    await db.execute('DELETE FROM myb_exchange WHERE user_id=?;', (user_id,))
@@ -2,13 +2,22 @@ import asyncio
 import datetime
 import functools
 import inspect
+import json
 import re
+import sys
+from collections import OrderedDict
 from json import JSONDecodeError
+from time import time
+from typing import Any, Dict, Optional, Tuple
 
 from nonebot import get_bot, logger
 from nonebot.adapters.onebot.v11 import ActionFailed
 from nonebot.exception import FinishedException
 
+from .circuit_breaker import CircuitOpenError
+from .config import config
+from .response_cache import response_cache, cacheable
+
 
 def auto_withdraw(seconds: int = -1):
     def wrapper(func):
@@ -28,31 +37,141 @@ def auto_withdraw(seconds: int = -1):
     return wrapper
 
 
+class LRUCache:
+    """
+    有界的内存缓存，条目写入ttl秒后过期，条目数超过max_size或估算占用超过max_memory字节时淘汰最久未使用的，
+    inflight记录正在加载中的键，同一个键同时只会有一次加载
+    """
+
+    def __init__(self, ttl: float, max_size: int, max_memory: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_memory = max_memory
+        # 键 -> (写入时间戳, 值, 估算大小)
+        self.data: OrderedDict = OrderedDict()
+        self.memory = 0
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        if time() - item[0] > self.ttl:
+            self._pop(key)
+            return None
+        self.data.move_to_end(key)
+        return item[0], item[1]
+
+    def set(self, key: str, value: Any, created: Optional[float] = None):
+        size = _estimate_size(value)
+        self._pop(key)
+        self.data[key] = (created or time(), value, size)
+        self.memory += size
+        while self.data and (len(self.data) > self.max_size or self.memory > self.max_memory):
+            self._pop(next(iter(self.data)))
+
+    def _pop(self, key: str):
+        item = self.data.pop(key, None)
+        if item is not None:
+            self.memory -= item[2]
+
+    def clear(self):
+        self.data.clear()
+        self.memory = 0
+
+
+def _estimate_size(value: Any) -> int:
+    # 缓存的大多是接口返回的json，按序列化后的长度估算占用
+    try:
+        return len(json.dumps(value, ensure_ascii=False))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
 # 缓存装饰器 ttl为过期时间 参数use_cache决定是否使用缓存，默认为True
-def cache(ttl=datetime.timedelta(hours=1)):
+# persist不为空时以其作为接口名，把成功的响应同时写入落盘的接口缓存，派蒙重启后依然可以命中，落盘的键同样只由接口名和arg_key中的参数组成
+# max_size和max_memory为该函数缓存的条目数和估算内存(MB)上限，默认取配置项
+# hard_ttl大于ttl时开启过期后重新验证：超过ttl但未超过hard_ttl的缓存会直接返回，同时在后台刷新
+# arg_key为参与缓存键的参数名(或参数名元组)，默认为除use_cache外的全部参数；结果与调用者无关时(如按uid查询的接口)
+# 应只填决定结果的参数，不同调用者同时查询同一个uid时才能合并为一次请求
+def cache(ttl=datetime.timedelta(hours=1), persist='', max_size=None, max_memory=None, hard_ttl=None, arg_key=None):
+    if isinstance(arg_key, str):
+        arg_key = (arg_key,)
+
     def wrap(func):
-        cache_data = {}
+        signature = inspect.signature(func)
+        soft = ttl.total_seconds()
+        hard = max(soft, hard_ttl.total_seconds()) if hard_ttl else soft
+        store = LRUCache(hard, max_size or config.paimon_cache_max_size,
+                         (max_memory or config.paimon_cache_max_memory) * 1024 * 1024)
+
+        async def fetch(ins_key, args, kw, background=False):
+            value = await func(*args, **kw)
+            # 后台刷新失败(如cookie用完)时保留原有的缓存，不用提示信息覆盖它；
+            # 键与调用者无关时，也不把某个调用者的提示信息缓存给其他人
+            if (background or arg_key) and persist and not cacheable(value):
+                return value
+            store.set(ins_key, value)
+            if persist and cacheable(value):
+                try:
+                    await response_cache.set(persist, ins_key, value, hard)
+                except Exception as e:
+                    logger.warning(f'派蒙写入{persist}接口缓存失败: {e}')
+            return value
 
-        @functools.wraps(func)
-        async def wrapped(*args, **kw):
-            nonlocal cache_data
-            bound = inspect.signature(func).bind(*args, **kw)
-            bound.apply_defaults()
-            ins_key = '|'.join(['%s_%s' % (k, v) for k, v in bound.arguments.items()])
-            default_data = {"time": None, "value": None}
-            data = cache_data.get(ins_key, default_data)
-            now = datetime.datetime.now()
-            if 'use_cache' not in kw:
-                kw['use_cache'] = True
-            if not kw['use_cache'] or not data['time'] or now - data['time'] > ttl:
+        async def load(ins_key, args, kw):
+            if persist:
                 try:
-                    data['value'] = await func(*args, **kw)
-                    data['time'] = now
-                    cache_data[ins_key] = data
+                    res = await response_cache.get(persist, ins_key)
                 except Exception as e:
-                    raise e
-            return data['value']
+                    logger.warning(f'派蒙读取{persist}接口缓存失败: {e}')
+                    res = None
+                if res:
+                    store.set(ins_key, res[0], res[1])
+                    return res[0]
+            return await fetch(ins_key, args, kw)
+
+        def revalidate(ins_key, args, kw):
+            if ins_key in store.inflight:
+                return
+            future = store.inflight[ins_key] = asyncio.ensure_future(fetch(ins_key, args, kw, background=True))
+
+            def done(f):
+                if store.inflight.get(ins_key) is f:
+                    store.inflight.pop(ins_key)
+                if not f.cancelled() and f.exception():
+                    logger.warning(f'派蒙后台刷新{func.__name__}的缓存失败: {f.exception()}')
+
+            future.add_done_callback(done)
 
+        @functools.wraps(func)
+        async def wrapped(*args, **kw):
+            bound = signature.bind(*args, **kw)
+            bound.apply_defaults()
+            ins_key = '|'.join(['%s_%s' % (k, v) for k, v in bound.arguments.items()
+                                if k != 'use_cache' and (not arg_key or k in arg_key)])
+            # 被装饰的函数没有use_cache参数时(如按url缓存的查询)总是使用缓存
+            if not bound.arguments.get('use_cache', True):
+                return await fetch(ins_key, args, kw)
+            item = store.get(ins_key)
+            if item:
+                if time() - item[0] > soft:
+                    revalidate(ins_key, args, kw)
+                return item[1]
+            # 同一个键已经在加载时直接等待它的结果，不再重复请求接口
+            future = store.inflight.get(ins_key)
+            if future is None:
+                future = store.inflight[ins_key] = asyncio.ensure_future(load(ins_key, args, kw))
+                future.add_done_callback(lambda f: store.inflight.pop(ins_key, None)
+                                         if store.inflight.get(ins_key) is f else None)
+            value = await asyncio.shield(future)
+            # 从落盘缓存读到的可能是已过ttl的旧响应，同样在后台刷新
+            item = store.get(ins_key)
+            if item and time() - item[0] > soft:
+                revalidate(ins_key, args, kw)
+            return value
+
+        wrapped.cache = store
         return wrapped
 
     return wrap
@@ -72,6 +191,8 @@ def exception_handler():
             except ActionFailed:
                 logger.exception('账号可能被风控，消息发送失败')
                 await get_bot().send(event, f'派蒙可能被风控，也可能是没有该图片资源，消息发送失败')
+            except CircuitOpenError as e:
+                await get_bot().send(event, str(e))
             except JSONDecodeError:
                 await get_bot().send(event, '派蒙获取信息失败，重试一下吧')
             # except IndexError or KeyError as e:
@@ -0,0 +1,265 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Any, Deque, Dict, List, Optional, Union
+
+import httpx
+from nonebot import get_driver, logger
+
+from .circuit_breaker import get_breaker
+from .config import config
+
+try:
+    import h2  # noqa: F401 httpx需要h2才能使用HTTP/2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+class ClientRegistry:
+    """
+    按上游站点分组管理的httpx连接池，同一组(如*.mihoyo.com)的请求复用同一个客户端，
+    连接保持长连接，避免每次查询都重新进行DNS解析、TCP和TLS握手
+    """
+
+    # 启动时预先建立的分组，其余分组在第一次请求时建立
+    preset = ('mihoyo.com', 'enka.network')
+    # 由两段组成的公共后缀，这些后缀下按最后三段分组，不同站点不会共用连接池和熔断器
+    public_suffixes = {'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'edu.cn', 'ac.cn',
+                       'com.hk', 'com.tw', 'com.sg', 'com.au', 'co.jp', 'co.kr', 'co.uk', 'org.uk'}
+
+    def __init__(self, max_connections: int = 20, keepalive_expiry: float = 30):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def family(url: Union[str, httpx.URL]) -> str:
+        host = httpx.URL(url).host
+        if host.replace('.', '').isdigit():
+            return host
+        labels = host.split('.')
+        if '.'.join(labels[-2:]) in ClientRegistry.public_suffixes:
+            return '.'.join(labels[-3:])
+        return '.'.join(labels[-2:])
+
+    def client(self, url: Union[str, httpx.URL]) -> httpx.AsyncClient:
+        family = self.family(url)
+        client = self.clients.get(family)
+        if client is None or client.is_closed:
+            client = self.clients[family] = httpx.AsyncClient(http2=HTTP2, limits=self.limits,
+                                                              timeout=httpx.Timeout(20, connect=10))
+        return client
+
+    def start(self):
+        for family in self.preset:
+            self.client(f'https://{family}')
+        logger.debug(f'派蒙HTTP连接池已建立，HTTP/2{"已" if HTTP2 else "未"}启用')
+
+    async def close(self):
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+registry = ClientRegistry(max_connections=config.paimon_http_max_connections)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    registry.start()
+
+
+@driver.on_shutdown
+async def _():
+    await registry.close()
+
+
+# 替身服务器有fixture的enka镜像
+proxied_hosts = ('enka.network', 'enka.microgg.cn')
+
+
+def _mocked(host: str) -> bool:
+    # 替身服务器只有接口的fixture：米游社的各个api域名(含抽卡记录)和enka镜像，图片等静态资源和其他站点照常请求
+    if host.endswith('.mihoyo.com'):
+        return 'api' in host.split('.')[0]
+    return host in proxied_hosts
+
+
+def _proxied(url: str) -> str:
+    # 配置了替身服务器时，上述域名的 https://host/path 改写为 {paimon_upstream_proxy}/host/path
+    if not config.paimon_upstream_proxy:
+        return url
+    origin = httpx.URL(url)
+    if not _mocked(origin.host):
+        return url
+    return f'{config.paimon_upstream_proxy.rstrip("/")}/{origin.host}{origin.raw_path.decode("ascii")}'
+
+
+async def request(method: str,
+                  url: str,
+                  *,
+                  timeout: Optional[float] = 20,
+                  **kwargs) -> httpx.Response:
+    """
+    说明：
+        使用连接池发送请求，该上游熔断中时直接抛出CircuitOpenError；配置了paimon_upstream_proxy时，
+        米游社和enka接口的请求改为发往替身服务器
+    参数：
+        :param method: 请求方法
+        :param url: url
+        :param timeout: 超时时间
+    """
+    breaker = get_breaker(registry.family(url))
+    breaker.before()
+    start = monotonic()
+    try:
+        resp = await registry.client(url).request(method, _proxied(url), timeout=timeout, **kwargs)
+    except httpx.TransportError:
+        breaker.after(False, monotonic() - start)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.after(resp.status_code < 500, monotonic() - start)
+    return resp
+
+
+async def get(url: str,
+              *,
+              headers: Optional[Dict[str, str]] = None,
+              params: Optional[Dict[str, Any]] = None,
+              timeout: Optional[float] = 20,
+              **kwargs) -> httpx.Response:
+    """
+    说明：
+        使用连接池的get请求，参数与aiorequests.get一致
+    参数：
+        :param url: url
+        :param headers: 请求头
+        :param params: params
+        :param timeout: 超时时间
+    """
+    return await request('GET', url, headers=headers, params=params, timeout=timeout, **kwargs)
+
+
+async def post(url: str,
+               *,
+               headers: Optional[Dict[str, str]] = None,
+               params: Optional[Dict[str, Any]] = None,
+               data: Optional[Dict[str, Any]] = None,
+               json: Optional[Dict[str, Union[Any, str]]] = None,
+               timeout: Optional[float] = 20,
+               **kwargs) -> httpx.Response:
+    """
+    说明：
+        使用连接池的post请求，参数与aiorequests.post一致
+    参数：
+        :param url: url
+        :param headers: 请求头
+        :param params: params
+        :param data: data
+        :param json: json
+        :param timeout: 超时时间
+    """
+    return await request('POST', url, headers=headers, params=params, data=data, json=json, timeout=timeout,
+                         **kwargs)
+
+
+class MirrorGroup:
+    """
+    提供同一份数据的多个镜像站，先请求当前最快的镜像，若超过它近期的p90延迟仍未返回，再同时请求下一个镜像，
+    取最先返回的有效json并取消其余请求；每个镜像的延迟和错误率都会被记录，据此自动选出最快的镜像作为主镜像
+    """
+
+    def __init__(self, bases: List[str], window: int = 50, min_delay: float = 0.3, max_delay: float = 3):
+        self.bases = bases
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        # 镜像 -> 最近成功请求的延迟(秒)
+        self.latency: Dict[str, Deque[float]] = {base: deque(maxlen=window) for base in bases}
+        # 镜像 -> 指数加权的错误率
+        self.error: Dict[str, float] = {base: 0.0 for base in bases}
+
+    def _quantile(self, base: str, q: float) -> Optional[float]:
+        samples = sorted(self.latency[base])
+        if len(samples) < 5:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def ranked(self) -> List[str]:
+        """
+        按中位延迟和错误率给镜像排序，样本不足的镜像视为1秒，排序相同时保持配置的顺序
+        """
+
+        def score(base: str) -> float:
+            p50 = self._quantile(base, 0.5)
+            return (p50 if p50 is not None else 1) * (1 + 4 * self.error[base])
+
+        return sorted(self.bases, key=score)
+
+    def hedge_delay(self, base: str) -> float:
+        p90 = self._quantile(base, 0.9)
+        if p90 is None:
+            return 1
+        return min(self.max_delay, max(self.min_delay, p90))
+
+    def _record(self, base: str, latency: Optional[float]):
+        if latency is None:
+            self.error[base] = self.error[base] * 0.8 + 0.2
+        else:
+            self.error[base] *= 0.8
+            self.latency[base].append(latency)
+
+    async def _fetch(self, base: str, path: str, **kwargs) -> Any:
+        start = monotonic()
+        try:
+            resp = await get(base + path, **kwargs)
+            resp.raise_for_status()
+            data = resp.json()
+        except asyncio.CancelledError:
+            # 被更快的镜像抢先时，已等待的时长只是该镜像延迟的下限，只有比它的中位延迟还长时才记录下来，
+            # 使其排名后移；更短的时长说明不了什么，记录下来反而会让没返回的镜像显得更快
+            elapsed = monotonic() - start
+            p50 = self._quantile(base, 0.5)
+            if p50 is not None and elapsed > p50:
+                self.latency[base].append(elapsed)
+            raise
+        except Exception:
+            self._record(base, None)
+            raise
+        self._record(base, monotonic() - start)
+        return data
+
+    async def get_json(self, path: str, **kwargs) -> Any:
+        """
+        说明：
+            对冲地请求各镜像，返回最先得到的有效json，全部镜像都失败时抛出最后一个异常
+        参数：
+            :param path: 镜像地址之后的路径
+            :param kwargs: 传给get的其他参数
+        """
+        order = self.ranked()
+        pending: Dict[asyncio.Future, str] = {}
+        last_error: Optional[BaseException] = None
+        try:
+            while order or pending:
+                # 首次进入、等待超时或有请求失败时，都再发出下一个镜像的请求
+                if order:
+                    base = order.pop(0)
+                    pending[asyncio.ensure_future(self._fetch(base, path, **kwargs))] = base
+                timeout = self.hedge_delay(base) if order else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    failed = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.debug(f'派蒙请求镜像{failed}失败: {last_error}')
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import os
+from io import BytesIO
+from pathlib import Path
+from time import time
+from typing import Optional
+
+from nonebot import get_driver, logger
+from nonebot.adapters.onebot.v11 import MessageSegment
+
+from .config import config
+
+
+def _suffix(data: bytes) -> str:
+    if data[:2] == b'\xff\xd8':
+        return '.jpg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    return '.png'
+
+
+class ImageStore:
+    """
+    按内容的哈希把编码好的图片写入目录，消息中只放file:///路径或本地HTTP地址，协议端直接读取文件，
+    不必把整张图片base64后放进消息；写入超过ttl秒的文件由后台任务定期删除
+    """
+
+    def __init__(self, path: Path, ttl: int = 600, base_url: str = ''):
+        self.path = path
+        self.ttl = ttl
+        self.base_url = base_url.rstrip('/')
+        self._janitor_task: Optional[asyncio.Task] = None
+
+    def uri(self, name: str) -> str:
+        if self.base_url:
+            return f'{self.base_url}/{name}'
+        return (self.path / name).resolve().as_uri()
+
+    def save(self, data: bytes) -> str:
+        """
+        写入图片，内容相同的图片只写一次并刷新修改时间
+        :param data: 编码好的图片
+        :return: 文件名
+        """
+        name = hashlib.sha1(data).hexdigest() + _suffix(data)
+        file = self.path / name
+        try:
+            os.utime(file)
+            return name
+        except FileNotFoundError:
+            pass
+        self.path.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再改名，协议端不会读到写了一半的图片
+        temp_file = self.path / f'{name}.{os.getpid()}.part'
+        temp_file.write_bytes(data)
+        temp_file.replace(file)
+        return name
+
+    def segment(self, data: bytes) -> MessageSegment:
+        return MessageSegment.image(file=self.uri(self.save(data)))
+
+    async def async_segment(self, data: bytes) -> MessageSegment:
+        name = await asyncio.get_running_loop().run_in_executor(None, self.save, data)
+        return MessageSegment.image(file=self.uri(name))
+
+    def cleanup(self) -> int:
+        """
+        删除写入超过ttl秒的图片
+        :return: 删除的文件数
+        """
+        if not self.path.exists():
+            return 0
+        expire = time() - self.ttl
+        removed = 0
+        for file in self.path.iterdir():
+            try:
+                if file.stat().st_mtime < expire:
+                    file.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    async def _janitor_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(self.ttl / 2, 30))
+            try:
+                removed = await loop.run_in_executor(None, self.cleanup)
+                if removed:
+                    logger.debug(f'派蒙清理了{removed}张过期的图片文件')
+            except OSError as e:
+                logger.warning(f'派蒙清理图片文件失败: {e}')
+
+    def start(self):
+        if self._janitor_task is None:
+            self._janitor_task = asyncio.create_task(self._janitor_loop())
+
+    def close(self):
+        if self._janitor_task is not None:
+            self._janitor_task.cancel()
+            self._janitor_task = None
+
+
+image_store = ImageStore(Path(config.paimon_image_store_path), ttl=config.paimon_image_store_ttl,
+                         base_url=config.paimon_image_store_url)
+
+
+def image_segment(data: bytes) -> MessageSegment:
+    """
+    把编码好的图片构造成MessageSegment，开启paimon_image_store时写入文件后发送文件地址，否则放进消息中发送
+    :param data: 编码好的图片
+    """
+    if config.paimon_image_store:
+        return image_store.segment(data)
+    return MessageSegment.image(BytesIO(data))
+
+
+async def async_image_segment(data: bytes) -> MessageSegment:
+    """
+    同image_segment，在后台线程中写入文件
+    :param data: 编码好的图片
+    """
+    if config.paimon_image_store:
+        return await image_store.async_segment(data)
+    return MessageSegment.image(BytesIO(data))
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    if config.paimon_image_store:
+        image_store.start()
+
+
+@driver.on_shutdown
+async def _():
+    image_store.close()
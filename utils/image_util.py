@@ -0,0 +1,387 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Hashable, Iterable, Optional, Tuple, Union
+
+import httpx
+from PIL import Image, ImageFont
+from nonebot import get_driver, logger
+
+from . import http_util
+from .config import config
+
+res_path = Path() / 'resources' / 'LittlePaimon'
+
+# 各卡片常用的字体和字号，启动时预先载入
+common_fonts = {
+    'msyh.ttc':      (16, 18, 20, 21, 24, 25, 30, 35, 36),
+    'msyhbd.ttc':    (25, 40),
+    'hywh.ttf':      (30, 34),
+    'number.ttf':    (27, 34, 48),
+    '优设标题黑.ttf': (40, 60),
+}
+
+# 图片编码方案，format为None时RGB图片编码为JPEG，其余为PNG；quality为该方案的质量上限，
+# 调用方传入的质量更高时按上限编码，没有quality的方案使用调用方的质量；其他选项原样传给PIL
+encode_profiles = {
+    # 普通的JPEG和PNG
+    'default': {'format': None},
+    # 渐进式、优化过霍夫曼表的JPEG和压缩过的PNG，质量不超过85，体积更小，各QQ客户端都能显示
+    'chat':    {'format': None, 'quality': 85, 'progressive': True, 'optimize': True},
+    # WebP，保留透明通道且体积最小，需要协议端和QQ客户端支持
+    'webp':    {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+# 按大小上限压缩时JPEG和WebP质量的下限
+min_quality = 30
+
+# (图片url, 本地缓存路径, 缓存的尺寸)
+Icon = Tuple[str, Union[str, Path], Optional[Tuple[int, int]]]
+
+
+# FreeTypeFont不能在多个线程中同时使用，字体按线程分别缓存
+_thread_fonts = threading.local()
+
+
+def load_font(font: str, size: int) -> ImageFont.FreeTypeFont:
+    """
+    读取resources/LittlePaimon下的字体，同一字体文件和字号在每个线程(进程)中只解析一次，该线程中的各绘图模块共用
+    :param font: 字体文件名
+    :param size: 字号
+    """
+    fonts = getattr(_thread_fonts, 'fonts', None)
+    if fonts is None:
+        fonts = _thread_fonts.fonts = {}
+    font_obj = fonts.get((font, size))
+    if font_obj is None:
+        font_obj = fonts[(font, size)] = ImageFont.truetype(str(res_path / font), size)
+    return font_obj
+
+
+def warm_up_fonts():
+    """
+    在当前线程中预先载入常用的字体，在绘图线程或进程启动时调用
+    """
+    for font, sizes in common_fonts.items():
+        for size in sizes:
+            try:
+                load_font(font, size)
+            except OSError:
+                # 资源还没有下载时跳过，用到时再读取
+                break
+
+
+class ImageCache:
+    """
+    解码后图片的LRU缓存，保存已经缩放、转换好可以直接贴到卡片上的图片，总大小超过max_bytes时淘汰最久未用的；
+    缓存中的图片是各次绘图共用的，取出后只能读取或贴到其他图片上，不能在上面绘制
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.images: 'OrderedDict[Hashable, Image.Image]' = OrderedDict()
+        self.size = 0
+        # 绘图在后台线程中进行，启动时的预载入也在线程中进行
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(img: Image.Image) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, key: Hashable) -> Optional[Image.Image]:
+        with self.lock:
+            img = self.images.get(key)
+            if img is not None:
+                self.images.move_to_end(key)
+            return img
+
+    def set(self, key: Hashable, img: Image.Image):
+        size = self._sizeof(img)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.images.pop(key, None)
+            if old is not None:
+                self.size -= self._sizeof(old)
+            self.images[key] = img
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.images.popitem(last=False)
+                self.size -= self._sizeof(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.size = 0
+
+
+image_cache = ImageCache(max_bytes=config.paimon_image_cache_size * 1024 * 1024)
+# 背景、边框等resources下的静态素材
+asset_cache = ImageCache(max_bytes=config.paimon_asset_cache_size * 1024 * 1024)
+# 预先合成好静态图层的卡片模板底图
+template_cache = ImageCache(max_bytes=config.paimon_template_cache_size * 1024 * 1024)
+
+# 启动时预先载入的静态素材，(resources/LittlePaimon下的路径, 尺寸, 模式)，需与绘图时的参数一致才能命中
+preload_assets = [
+    ('daily_note/ssbq.png', None, 'RGBA'),
+    ('daily_note/透明圆.png', None, None),
+    ('daily_note/finished.png', None, None),
+    ('monthinfo/bg.png', None, 'RGBA'),
+    ('monthinfo/line.png', None, 'RGBA'),
+    ('monthinfo/circle.png', None, 'RGBA'),
+    ('monthinfo/box.png', None, 'RGBA'),
+    ('player_card/背景.png', None, 'RGBA'),
+    ('player_card/卡片顶部.png', None, None),
+    ('player_card/卡片身体.png', (1304, 474), None),
+    ('player_card/卡片底部.png', None, None),
+    ('player_card/gacha_log_top.png', None, None),
+    ('player_card/卡片身体.png', (768, 80), None),
+    ('player_card/卡片底部.png', (768, 51), None),
+    ('player_card2/底遮罩.png', None, None),
+    ('player_card2/等级遮罩.png', None, None),
+    ('player_card2/遮罩top.png', None, None),
+    ('player_card2/遮罩body.png', None, None),
+    ('player_card2/遮罩bottom.png', None, None),
+    ('abyss/abyss_total.png', None, 'RGBA'),
+    ('gacha_res/background.png', None, None),
+    *((f'gacha_res/{rank}_background.png', (143, 845), None) for rank in (3, 4, 5)),
+    *((f'gacha_res/{rank}_star.png', (119, 30), None) for rank in (3, 4, 5)),
+]
+
+
+def _decode_asset(path: Union[str, Path],
+                  size: Optional[Union[Tuple[int, int], float]],
+                  crop: Optional[Tuple[int, int, int, int]],
+                  mode: Optional[str]) -> Image.Image:
+    # 与load_image的处理顺序一致：缩放、裁剪、转换模式
+    img = Image.open(path)
+    if isinstance(size, float):
+        img = img.resize((int(img.size[0] * size), int(img.size[1] * size)), Image.ANTIALIAS)
+    elif size:
+        img = img.resize(size, Image.ANTIALIAS)
+    if crop:
+        img = img.crop(crop)
+    if mode:
+        img = img.convert(mode)
+    img.load()
+    return img
+
+
+def load_asset(path: Union[str, Path],
+               *,
+               size: Optional[Union[Tuple[int, int], float]] = None,
+               crop: Optional[Tuple[int, int, int, int]] = None,
+               mode: Optional[str] = None) -> Image.Image:
+    """
+    说明：
+        带缓存的load_image，同一素材(按路径、尺寸、裁剪、模式区分)只解码和处理一次，之后返回缓存的副本，可以随意修改
+    参数：
+        :param path: 图片路径
+        :param size: 尺寸
+        :param crop: 裁剪范围
+        :param mode: 图片模式
+    """
+    key = (str(Path(path)), size, crop, mode)
+    img = asset_cache.get(key)
+    if img is None:
+        img = _decode_asset(path, size, crop, mode)
+        asset_cache.set(key, img)
+    return img.copy()
+
+
+def load_template(build: Callable[..., Image.Image], *args: Hashable) -> Image.Image:
+    """
+    说明：
+        读取卡片模板底图，build(*args)把背景、遮罩、固定的文字和边框等不随数据变化的图层合成为底图，
+        同一模板和参数只合成一次，之后返回缓存的副本，只需在副本上绘制随数据变化的内容
+    参数：
+        :param build: 合成模板底图的函数
+        :param args: 模板参数，如元素、卡片高度
+    """
+    key = (build.__module__, build.__qualname__, args)
+    img = template_cache.get(key)
+    if img is None:
+        img = build(*args)
+        template_cache.set(key, img)
+    return img.copy()
+
+
+def warm_up():
+    """
+    预先载入常用的静态素材，在启动时和每个绘图进程启动时调用
+    """
+    if not config.paimon_asset_preload:
+        return
+    for path, size, mode in preload_assets:
+        path = res_path / path
+        if path.exists():
+            asset_cache.set((str(path), size, None, mode), _decode_asset(path, size, None, mode))
+
+
+def load_icon(url: str,
+              *,
+              save_path: Union[str, Path],
+              size: Optional[Tuple[int, int]] = None,
+              mode: Optional[str] = None) -> Image.Image:
+    """
+    说明：
+        在绘图线程或进程中读取网络图标，与aiorequests.get_img的结果一致；图标通常已由prefetch_images下载到本地，
+        本地没有时才在这里同步下载。同一图标(按缓存路径、尺寸、模式区分)只解码和缩放一次，返回的图片是共用的，不能修改
+    参数：
+        :param url: 图片url
+        :param save_path: 本地缓存路径
+        :param size: 图片尺寸
+        :param mode: 图片模式
+    """
+    key = (str(save_path), size, mode)
+    img = image_cache.get(key)
+    if img is None:
+        save_path = Path(save_path)
+        if not save_path.exists():
+            resp = httpx.get(url, timeout=20)
+            if resp.status_code != 200 or b'NoSuchKey' in resp.content:
+                raise FileNotFoundError(2, '图标下载失败', str(save_path))
+            _save_icon(resp.content, save_path, size, mode)
+        img = _decode_asset(save_path, size, None, mode)
+        image_cache.set(key, img)
+    return img
+
+
+def encode_image(img: Image.Image,
+                 *,
+                 size: Optional[Union[Tuple[int, int], float]] = None,
+                 crop: Optional[Tuple[int, int, int, int]] = None,
+                 quality: Optional[int] = 100,
+                 mode: Optional[str] = None,
+                 profile: Optional[str] = None,
+                 max_bytes: Optional[int] = None) -> bytes:
+    """
+    说明：
+        图片预处理后按编码方案编码；编码后超过大小上限时，二分查找不超过上限的最高质量，PNG则铺上白底改为JPEG再压缩
+    参数：
+        :param img: 图片
+        :param size: 预处理尺寸
+        :param crop: 预处理裁剪大小
+        :param quality: 图片质量，不超过编码方案的质量上限
+        :param mode: 预处理图像模式
+        :param profile: 编码方案，见encode_profiles，为None时使用配置paimon_image_profile
+        :param max_bytes: 编码后的大小上限（字节），为None时使用配置paimon_image_max_size，为0时不限制
+    """
+    if isinstance(size, float):
+        img = img.resize((int(img.size[0] * size), int(img.size[1] * size)), Image.ANTIALIAS)
+    elif size:
+        img = img.resize(size, Image.ANTIALIAS)
+    if crop:
+        img = img.crop(crop)
+    if mode:
+        img = img.convert(mode)
+    if profile is None:
+        profile = config.paimon_image_profile
+    if max_bytes is None:
+        max_bytes = config.paimon_image_max_size * 1024
+    options = dict(encode_profiles.get(profile) or encode_profiles['default'])
+    image_format = options.pop('format') or ('JPEG' if img.mode == 'RGB' else 'PNG')
+    max_quality = options.pop('quality', None)
+    if max_quality:
+        quality = min(quality or 100, max_quality)
+    start = perf_counter()
+    data = _save_image(img, image_format, quality, options)
+    if max_bytes and len(data) > max_bytes:
+        if image_format == 'PNG':
+            img = _flatten(img)
+            image_format = 'JPEG'
+            options = {'progressive': True, 'optimize': True}
+            high = quality or 100
+        else:
+            high = (quality or 100) - 1
+        low, best = min_quality, None
+        while low <= high:
+            quality = (low + high) // 2
+            data = _save_image(img, image_format, quality, options)
+            if len(data) <= max_bytes:
+                best = data
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is not None:
+            data, quality = best, low - 1
+    logger.debug(f'派蒙编码图片{img.width}x{img.height}为{image_format}(质量{quality})，'
+                 f'大小{len(data) // 1024}KB，用时{(perf_counter() - start) * 1000:.1f}ms')
+    return data
+
+
+def _save_image(img: Image.Image, image_format: str, quality: Optional[int], options: dict) -> bytes:
+    bio = BytesIO()
+    img.save(bio, format=image_format, quality=quality, **options)
+    return bio.getvalue()
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    # JPEG没有透明通道，透明部分铺成白色
+    if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+        img = img.convert('RGBA')
+        bg = Image.new('RGB', img.size, (255, 255, 255))
+        bg.paste(img, mask=img.split()[3])
+        return bg
+    return img.convert('RGB')
+
+
+def _save_icon(content: bytes, save_path: Path, size: Optional[Tuple[int, int]], mode: Optional[str]):
+    # 与aiorequests.get_img保存的图片一致：先缩放再转换模式
+    img = Image.open(BytesIO(content))
+    if size:
+        img = img.resize(size, Image.ANTIALIAS)
+    if mode:
+        img = img.convert(mode)
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+    # 先写临时文件再改名，同时绘制的其他卡片不会读到写了一半的图片
+    temp_path = save_path.with_name(f'{save_path.name}.{os.getpid()}.{id(img)}.part')
+    img.save(temp_path, format=Image.registered_extensions().get(save_path.suffix.lower(), 'PNG'))
+    temp_path.replace(save_path)
+
+
+async def _download_icon(url: str, save_path: Path, size: Optional[Tuple[int, int]], mode: Optional[str]):
+    resp = await http_util.get(url)
+    if resp.status_code != 200 or b'NoSuchKey' in resp.content:
+        raise FileNotFoundError(f'{url}: {resp.status_code}')
+    await asyncio.get_running_loop().run_in_executor(None, _save_icon, resp.content, save_path, size, mode)
+
+
+async def prefetch_images(icons: Iterable[Icon], mode: Optional[str] = 'RGBA', limit: int = 8):
+    """
+    说明：
+        绘图前把卡片要用到的网络图标中本地还没有的并发下载到缓存路径，之后绘图时的get_img只需读取本地文件；
+        下载失败的图标只记录日志，绘图时get_img会再尝试下载
+    参数：
+        :param icons: (图片url, 本地缓存路径, 尺寸)的列表，同一缓存路径只下载一次
+        :param mode: 图片模式
+        :param limit: 同时下载的数量上限
+    """
+    missing = {}
+    for url, save_path, size in icons:
+        save_path = Path(save_path)
+        if url and save_path not in missing and not save_path.exists():
+            missing[save_path] = (url, size)
+    if not missing:
+        return
+    semaphore = asyncio.Semaphore(limit)
+
+    async def download(save_path: Path, url: str, size: Optional[Tuple[int, int]]):
+        async with semaphore:
+            try:
+                await _download_icon(url, save_path, size, mode)
+            except Exception as e:
+                logger.debug(f'派蒙预先下载图标{url}失败: {e}')
+
+    await asyncio.gather(*(download(save_path, url, size) for save_path, (url, size) in missing.items()))
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    await asyncio.get_running_loop().run_in_executor(None, warm_up)
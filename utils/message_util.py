@@ -1,5 +1,6 @@
+import asyncio
 import re
-from io import BytesIO
+from functools import partial
 from pathlib import Path
 from time import time
 from typing import Union, Optional, Tuple
@@ -11,6 +12,8 @@ from nonebot import get_bot, logger
 from nonebot.adapters.onebot.v11 import MessageEvent, Message, MessageSegment
 
 from .db_util import get_last_query, update_last_query
+from .image_store import async_image_segment, image_segment
+from .image_util import encode_image
 
 # 加载敏感违禁词列表
 ban_word = []
@@ -19,8 +22,48 @@ with open(Path(__file__).parent / 'json_data' / 'ban_word.txt', 'r', encoding='u
         ban_word.append(line.strip())
 
 
+def _encode(img: Union[Image.Image, Path, str],
+            size: Optional[Union[Tuple[int, int], float]],
+            crop: Optional[Tuple[int, int, int, int]],
+            quality: Optional[int],
+            mode: Optional[str],
+            profile: Optional[str],
+            max_bytes: Optional[int]) -> bytes:
+    if isinstance(img, str) or isinstance(img, Path):
+        img = load_image(path=img, size=size, mode=mode, crop=crop)
+        return encode_image(img, quality=quality, profile=profile, max_bytes=max_bytes)
+    return encode_image(img, size=size, crop=crop, quality=quality, mode=mode, profile=profile, max_bytes=max_bytes)
+
+
 class MessageBuild:
 
+    @classmethod
+    async def AsyncImage(cls,
+                         img: Union[Image.Image, Path, str],
+                         *,
+                         size: Optional[Union[Tuple[int, int], float]] = None,
+                         crop: Optional[Tuple[int, int, int, int]] = None,
+                         quality: Optional[int] = 100,
+                         mode: Optional[str] = None,
+                         profile: Optional[str] = None,
+                         max_bytes: Optional[int] = None
+                         ) -> MessageSegment:
+        """
+        说明：
+            同Image，但图片的读取、预处理和编码都在后台线程中进行，不占用事件循环，在事件响应中应优先使用
+            :param img: 图片Image对象或图片路径，传入Image对象后不要再修改它
+            :param size: 预处理尺寸
+            :param crop: 预处理裁剪大小
+            :param quality: 预处理图片质量
+            :param mode: 预处理图像模式
+            :param profile: 编码方案，见image_util.encode_profiles
+            :param max_bytes: 编码后的大小上限（字节）
+            :return: MessageSegment.image
+        """
+        data = await asyncio.get_running_loop().run_in_executor(None, _encode, img, size, crop, quality, mode,
+                                                                 profile, max_bytes)
+        return await async_image_segment(data)
+
     @classmethod
     def Image(cls,
               img: Union[Image.Image, Path, str],
@@ -28,33 +71,23 @@ class MessageBuild:
               size: Optional[Union[Tuple[int, int], float]] = None,
               crop: Optional[Tuple[int, int, int, int]] = None,
               quality: Optional[int] = 100,
-              mode: Optional[str] = None
+              mode: Optional[str] = None,
+              profile: Optional[str] = None,
+              max_bytes: Optional[int] = None
               ) -> MessageSegment:
         """
         说明：
-            图片预处理并构造成MessageSegment
+            图片预处理并构造成MessageSegment，编码在调用处同步进行，在事件响应中请使用AsyncImage
             :param img: 图片Image对象或图片路径
             :param size: 预处理尺寸
             :param crop: 预处理裁剪大小
             :param quality: 预处理图片质量
             :param mode: 预处理图像模式
+            :param profile: 编码方案，见image_util.encode_profiles
+            :param max_bytes: 编码后的大小上限（字节）
             :return: MessageSegment.image
         """
-        if isinstance(img, str) or isinstance(img, Path):
-            img = load_image(path=img, size=size, mode=mode, crop=crop)
-        else:
-            if size:
-                if isinstance(size, float):
-                    img = img.resize((int(img.size[0] * size), int(img.size[1] * size)), Image.ANTIALIAS)
-                elif isinstance(size, tuple):
-                    img = img.resize(size, Image.ANTIALIAS)
-            if crop:
-                img = img.crop(crop)
-            if mode:
-                img = img.convert(mode)
-        bio = BytesIO()
-        img.save(bio, format='JPEG' if img.mode == 'RGB' else 'PNG', quality=quality)
-        return MessageSegment.image(bio)
+        return image_segment(_encode(img, size, crop, quality, mode, profile, max_bytes))
 
     @classmethod
     async def StaticImage(cls,
@@ -94,9 +127,8 @@ class MessageBuild:
             img = img.crop(crop)
         if mode:
             img = img.convert(mode)
-        bio = BytesIO()
-        img.save(bio, format='JPEG' if img.mode == 'RGB' else 'PNG', quality=quality)
-        return MessageSegment.image(bio)
+        data = await asyncio.get_running_loop().run_in_executor(None, partial(encode_image, img, quality=quality))
+        return await async_image_segment(data)
 
     @classmethod
     def Text(cls, text: str) -> MessageSegment:
@@ -0,0 +1,94 @@
+import asyncio
+from time import monotonic
+from typing import Dict, List, Optional
+
+from nonebot import logger
+
+from .circuit_breaker import get_breaker
+from .config import config
+
+
+class TokenBucket:
+    """
+    令牌桶，每分钟补充rate个令牌，最多积攒burst个，取不到令牌时等待到下一个令牌补充为止，
+    等待者按先来后到的顺序取得令牌
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate / 60
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    按上游接口分组的限速器，每组一个令牌桶，批量任务在每次请求前取一个令牌，而不是固定地随机等待
+    """
+
+    def __init__(self, limits: Dict[str, List[float]], upstreams: Dict[str, List[str]]):
+        self.buckets: Dict[str, TokenBucket] = {}
+        for group, limit in limits.items():
+            # 每分钟请求数不大于0(或没有填)时该组不限速，不为其建令牌桶
+            if not limit or limit[0] <= 0:
+                logger.info(f'派蒙的{group}接口限速配置为{limit}，该组接口不限速')
+                continue
+            self.buckets[group] = TokenBucket(*limit)
+        self.upstreams = upstreams
+
+    async def acquire(self, group: str):
+        """
+        取得group组的一个令牌，没有配置该组时不限速；该组的上游全部熔断时先暂停，等到恢复再继续
+        :param group: 接口组名
+        """
+        await self.wait_upstream(group)
+        bucket = self.buckets.get(group)
+        if bucket is not None:
+            await bucket.acquire()
+
+    async def wait_upstream(self, group: str):
+        breakers = [get_breaker(upstream) for upstream in self.upstreams.get(group, [])]
+        if not breakers or any(breaker.state == 'closed' for breaker in breakers):
+            return
+        logger.info(f'派蒙的{group}接口暂时不可用，批量任务暂停，等待接口恢复')
+        _, pending = await asyncio.wait([asyncio.ensure_future(breaker.wait_ready()) for breaker in breakers],
+                                        return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        logger.info(f'派蒙的{group}接口已可以请求，批量任务继续')
+
+
+rate_limiter = RateLimiter({
+    # 米游社战绩接口，如实时便签
+    'record':    config.paimon_rate_record,
+    # 米游社签到接口
+    'sign':      config.paimon_rate_sign,
+    # 米游社讨论区接口，用于米游币获取
+    'bbs':       config.paimon_rate_bbs,
+    # enka角色面板接口
+    'enka':      config.paimon_rate_enka,
+    # 抽卡记录接口
+    'gacha_log': config.paimon_rate_gacha_log,
+}, {
+    'record':    ['mihoyo.com'],
+    'sign':      ['mihoyo.com'],
+    'bbs':       ['mihoyo.com'],
+    'enka':      ['enka.network', 'microgg.cn'],
+    'gacha_log': ['mihoyo.com'],
+})
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from nonebot import get_driver, logger
+
+from .config import config
+
+
+class RenderCache:
+    """
+    绘制好的卡片图片缓存，以(绘图函数, 模板版本, 输入数据的哈希)为键保存编码后的图片，相同的数据再次查询时不必重新绘制；
+    内存中的总大小超过max_bytes时淘汰最久未用的，spill_max_bytes大于0时被淘汰的图片转存到spill_path下，之后命中时再读回内存
+    """
+
+    def __init__(self, max_bytes: int, spill_path: Path, spill_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.images: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.size = 0
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        # 已转存到磁盘的键和文件大小，按写入的先后排列
+        self.spilled: 'OrderedDict[str, int]' = OrderedDict()
+        self.spill_size = 0
+        self.counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(name: str, version: int, *data: Any) -> str:
+        """
+        生成缓存键
+        :param name: 绘图函数名
+        :param version: 模板版本，卡片布局或素材改动时增加，使旧的缓存失效
+        :param data: 绘图的输入数据，须能被json序列化
+        """
+        blob = json.dumps([name, version, data], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            self.counter['hit'] += 1
+            return image
+        if key in self.spilled:
+            image = await asyncio.get_running_loop().run_in_executor(None, self._read_spill, key)
+            if image is not None:
+                self.counter['disk_hit'] += 1
+                await self._spill(self._put(key, image))
+                return image
+            self._drop_spill(key)
+        self.counter['miss'] += 1
+        return None
+
+    async def set(self, key: str, image: bytes):
+        if not self.enabled or len(image) > self.max_bytes:
+            return
+        await self._spill(self._put(key, image))
+
+    def _put(self, key: str, image: bytes) -> List[Tuple[str, bytes]]:
+        old = self.images.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.images[key] = image
+        self.size += len(image)
+        evicted = []
+        while self.size > self.max_bytes:
+            evicted.append(self.images.popitem(last=False))
+            self.size -= len(evicted[-1][1])
+        return evicted
+
+    async def _spill(self, evicted: List[Tuple[str, bytes]]):
+        evicted = [(key, image) for key, image in evicted if key not in self.spilled]
+        if not evicted or self.spill_max_bytes <= 0:
+            return
+        removed = []
+        for key, image in evicted:
+            self.spilled[key] = len(image)
+            self.spill_size += len(image)
+        while self.spill_size > self.spill_max_bytes:
+            key, size = self.spilled.popitem(last=False)
+            self.spill_size -= size
+            removed.append(key)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_spill, evicted, removed)
+        except OSError as e:
+            logger.warning(f'派蒙转存卡片图片缓存失败: {e}')
+            for key, _ in evicted:
+                self._drop_spill(key)
+
+    def _drop_spill(self, key: str):
+        size = self.spilled.pop(key, None)
+        if size is not None:
+            self.spill_size -= size
+
+    def _write_spill(self, evicted: List[Tuple[str, bytes]], removed: List[str]):
+        self.spill_path.mkdir(parents=True, exist_ok=True)
+        for key, image in evicted:
+            temp_path = self.spill_path / f'{key}.{os.getpid()}.part'
+            temp_path.write_bytes(image)
+            temp_path.replace(self.spill_path / key)
+        for key in removed:
+            (self.spill_path / key).unlink(missing_ok=True)
+
+    def _read_spill(self, key: str) -> Optional[bytes]:
+        try:
+            return (self.spill_path / key).read_bytes()
+        except OSError:
+            return None
+
+    def load(self):
+        """
+        启动时读取磁盘上已转存的图片，超出大小上限的从最早的开始删除
+        """
+        self.spilled.clear()
+        self.spill_size = 0
+        if not self.spill_path.exists():
+            return
+        files = sorted((f for f in self.spill_path.iterdir() if f.is_file()), key=lambda f: f.stat().st_mtime)
+        for f in files:
+            if f.suffix == '.part' or self.spill_max_bytes <= 0:
+                f.unlink(missing_ok=True)
+                continue
+            self.spilled[f.name] = f.stat().st_size
+            self.spill_size += self.spilled[f.name]
+        while self.spill_size > self.spill_max_bytes and self.spilled:
+            key, size = self.spilled.popitem(last=False)
+            self.spill_size -= size
+            (self.spill_path / key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        """
+        统计启动以来的命中情况
+        hit为内存中命中的次数，disk_hit为从磁盘读回的次数，miss为需要重新绘制的次数
+        """
+        counter = self.counter
+        total = counter['hit'] + counter['disk_hit'] + counter['miss']
+        return {
+            'hit':        counter['hit'],
+            'disk_hit':   counter['disk_hit'],
+            'miss':       counter['miss'],
+            'hit_rate':   round((counter['hit'] + counter['disk_hit']) / total, 4) if total else 0,
+            'count':      len(self.images),
+            'size':       self.size,
+            'disk_count': len(self.spilled),
+            'disk_size':  self.spill_size,
+        }
+
+
+render_cache = RenderCache(max_bytes=config.paimon_render_cache_size * 1024 * 1024,
+                           spill_path=Path() / 'data' / 'LittlePaimon' / 'render_cache',
+                           spill_max_bytes=config.paimon_render_cache_disk_size * 1024 * 1024)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, render_cache.load)
+    except OSError as e:
+        logger.warning(f'派蒙读取卡片图片缓存目录失败: {e}')
@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from nonebot import get_driver, logger
+from nonebot.adapters.onebot.v11 import MessageSegment
+
+from .config import config
+from .image_store import async_image_segment
+from .image_util import (asset_cache, encode_image, encode_profiles, image_cache, template_cache, warm_up,
+                         warm_up_fonts)
+from .render_cache import render_cache
+
+
+def _init_worker():
+    # 绘图进程在其他线程启动前就已fork出来，保险起见仍给缓存换成新锁，再预先载入字体和素材
+    image_cache.lock = threading.Lock()
+    asset_cache.lock = threading.Lock()
+    template_cache.lock = threading.Lock()
+    # fork出的进程随机数状态相同，重新播种，免得各进程随机选出的表情等完全一样
+    random.seed()
+    warm_up_fonts()
+    warm_up()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def default_workers() -> int:
+    """
+    paimon_render_workers为-1时的绘图进程数：留一个核给事件循环，最多4个；不支持fork或只有一个核时为0
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return 0
+    return max(0, min(4, (os.cpu_count() or 1) - 1))
+
+
+def _render(func: Callable, args: Tuple, kwargs: Dict[str, Any], encode: Dict[str, Any]) -> Union[bytes, str]:
+    img = func(*args, **kwargs)
+    if isinstance(img, str):
+        return img
+    return encode_image(img, **encode)
+
+
+class RenderPool:
+    """
+    卡片绘图执行器，PIL的绘制和编码都在这里进行，不占用事件循环；
+    workers大于0时用多个进程并行绘制(需要系统支持fork)，为0时在一个后台线程中绘制。
+    进程池在启动时由插件根模块最先注册的启动任务创建并立刻fork出全部进程：此时各绘图模块都已导入完，
+    子进程才能按名字找到绘图函数；而数据库、绘图等线程还没有启动，子进程不会继承被其他线程持有的锁。
+    进程意外退出后不再重新fork，改为在后台线程中绘制
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = default_workers() if workers < 0 else workers
+        self.executor: Optional[Executor] = None
+
+    def _create(self) -> Executor:
+        if self.workers > 0:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'),
+                                               initializer=_init_worker)
+                # 进程池在第一次提交任务时才fork，这里立刻提交，使全部进程在其他线程启动前创建
+                for _ in range(self.workers):
+                    executor.submit(_ping)
+                return executor
+            logger.warning('当前系统不支持fork，派蒙改为在后台线程中绘图')
+            self.workers = 0
+        return ThreadPoolExecutor(1, thread_name_prefix='paimon_render', initializer=warm_up_fonts)
+
+    def start(self):
+        if self.executor is None:
+            self.executor = self._create()
+
+    async def render(self,
+                     func: Callable,
+                     *args,
+                     size: Optional[Union[Tuple[int, int], float]] = None,
+                     crop: Optional[Tuple[int, int, int, int]] = None,
+                     quality: Optional[int] = 100,
+                     mode: Optional[str] = None,
+                     profile: Optional[str] = None,
+                     max_bytes: Optional[int] = None,
+                     cache_version: Optional[int] = None,
+                     **kwargs) -> Union[MessageSegment, str]:
+        """
+        说明：
+            在执行器中调用func(*args, **kwargs)绘图并编码，返回图片消息；func返回字符串时原样返回。
+            使用多进程时func须是模块级的函数，参数和返回值都要能被pickle；
+            指定cache_version时按参数缓存编码后的图片，参数相同时直接返回缓存，参数须能被json序列化
+        参数：
+            :param func: 返回PIL图片的绘图函数
+            :param size: 编码前的缩放尺寸
+            :param crop: 编码前的裁剪大小
+            :param quality: 图片质量
+            :param mode: 编码前转换的图像模式
+            :param profile: 编码方案，为None时使用配置paimon_image_profile
+            :param max_bytes: 编码后的大小上限（字节），为None时使用配置paimon_image_max_size
+            :param cache_version: 模板版本，卡片布局或素材改动时增加，为None时不缓存
+        """
+        self.start()
+        encode = {'size': size, 'crop': crop, 'quality': quality, 'mode': mode,
+                  'profile': profile or config.paimon_image_profile,
+                  'max_bytes': config.paimon_image_max_size * 1024 if max_bytes is None else max_bytes}
+        key = None
+        if cache_version is not None and render_cache.enabled:
+            # 编码方案的选项也算进键里，方案调整后旧的缓存不再命中
+            key = render_cache.make_key(f'{func.__module__}.{func.__qualname__}', cache_version, args, kwargs, encode,
+                                        encode_profiles.get(encode['profile']))
+            image = await render_cache.get(key)
+            if image is not None:
+                return await async_image_segment(image)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, _render, func, args, kwargs,
+                                                                      encode)
+        except BrokenProcessPool:
+            logger.error('派蒙的绘图进程意外退出，之后改为在后台线程中绘图')
+            self.close()
+            self.workers = 0
+            raise
+        if isinstance(result, str):
+            return result
+        if key is not None:
+            await render_cache.set(key, result)
+        return await async_image_segment(result)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+render_pool = RenderPool(workers=config.paimon_render_workers)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    render_pool.start()
+
+
+@driver.on_shutdown
+async def _():
+    render_pool.close()
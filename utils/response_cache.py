@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from time import time
+from typing import Any, Optional, Tuple
+
+from nonebot import get_driver, logger
+
+from .config import config
+from .db_engine import Database
+
+
+class ResponseCache:
+    """
+    落盘的接口响应缓存，以(接口, 参数)为键把响应压缩后存入独立的SQLite文件，重启后依然有效，
+    每个接口的过期时间由写入方指定，总大小超过max_bytes时先淘汰已过期的，再淘汰最早写入的
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.db = Database(path, readers=2)
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    @staticmethod
+    def _create(conn: sqlite3.Connection) -> int:
+        conn.execute('''CREATE TABLE IF NOT EXISTS response_cache
+        (
+            key TEXT PRIMARY KEY NOT NULL,
+            endpoint TEXT NOT NULL,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            expire_at INTEGER NOT NULL
+        );''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_expire_at ON response_cache (expire_at);')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_created_at ON response_cache (created_at);')
+        conn.execute('DELETE FROM response_cache WHERE expire_at<=?;', (int(time()),))
+        return conn.execute('SELECT IFNULL(SUM(size), 0) FROM response_cache;').fetchone()[0]
+
+    async def load(self):
+        self.size = await self.db.transaction(self._create)
+
+    async def get(self, endpoint: str, key: str) -> Optional[Tuple[Any, int]]:
+        """
+        读取未过期的缓存
+        :param endpoint: 接口名
+        :param key: 参数组成的键
+        :return: (响应, 写入时间戳)，没有缓存或已过期时返回None
+        """
+        res = await self.db.fetchone('SELECT value, created_at FROM response_cache WHERE key=? AND expire_at>?;',
+                                     (f'{endpoint}|{key}', int(time())))
+        if not res:
+            return None
+        return json.loads(zlib.decompress(res[0])), res[1]
+
+    async def set(self, endpoint: str, key: str, value: Any, ttl: float):
+        """
+        写入缓存
+        :param endpoint: 接口名
+        :param key: 参数组成的键
+        :param value: 可以json序列化的响应
+        :param ttl: 过期时间（秒）
+        """
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        now = int(time())
+
+        def _set(conn: sqlite3.Connection) -> int:
+            # 写入都在同一个写线程中串行执行，总大小按差值累加即可，不必每次求和
+            old = conn.execute('SELECT size FROM response_cache WHERE key=?;', (f'{endpoint}|{key}',)).fetchone()
+            conn.execute('REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?);',
+                         (f'{endpoint}|{key}', endpoint, blob, len(blob), now, now + int(ttl)))
+            size = self.size + len(blob) - (old[0] if old else 0)
+            if size > self.max_bytes:
+                size = self._evict(conn, size)
+            return size
+
+        self.size = await self.db.transaction(_set)
+
+    def _evict(self, conn: sqlite3.Connection, size: int) -> int:
+        # 淘汰到上限的九成，避免每次写入都触发淘汰
+        target = self.max_bytes * 0.9
+        conn.execute('DELETE FROM response_cache WHERE expire_at<=?;', (int(time()),))
+        size = conn.execute('SELECT IFNULL(SUM(size), 0) FROM response_cache;').fetchone()[0]
+        if size <= target:
+            return size
+        keys = []
+        for key, row_size in conn.execute('SELECT key, size FROM response_cache ORDER BY created_at;'):
+            if size <= target:
+                break
+            keys.append((key,))
+            size -= row_size
+        conn.executemany('DELETE FROM response_cache WHERE key=?;', keys)
+        logger.debug(f'派蒙接口缓存超过{self.max_bytes}字节，淘汰了{len(keys)}条最早的缓存')
+        return size
+
+    async def close(self):
+        await self.db.close()
+
+
+def cacheable(value: Any) -> bool:
+    """
+    只有米游社接口返回成功的响应才落盘，cookie失效、次数上限等提示字符串不缓存
+    """
+    return isinstance(value, dict) and value.get('retcode') == 0
+
+
+response_cache = ResponseCache(Path() / 'data' / 'LittlePaimon' / 'user_data' / 'response_cache.db',
+                               max_bytes=config.paimon_response_cache_size * 1024 * 1024)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    try:
+        await response_cache.load()
+    except Exception as e:
+        logger.error(f'派蒙接口缓存数据库载入失败: {e}')
+
+
+@driver.on_shutdown
+async def _():
+    await response_cache.close()